@@ -1,8 +1,14 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
-import asyncio
 import json
+import os
+
+from intent_engine import IntentEngine
+from mock_pacing import Pacer
+
+# Mock streaming pace; MOCK_PACING_MODE=none turns the server into a load-test target
+MOCK_TOKENS_PER_SECOND = float(os.getenv("MOCK_TOKENS_PER_SECOND", "10"))
 
 app = FastAPI(title="Simple Chat API")
 
@@ -15,12 +21,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def get_response(prompt: str) -> str:
-    """Generate Hebrew responses based on keywords"""
-    prompt_lower = prompt.lower()
-    
-    if any(word in prompt_lower for word in ['מוצר', 'פיתוח', 'חדש']):
-        return """שלום! אני שמח לעזור בפיתוח מוצר חדש.
+# Keyword intents, checked in order (first match wins)
+INTENTS = {
+    "מוצר": {
+        "keywords": ["מוצר", "פיתוח", "חדש"],
+        "response": """שלום! אני שמח לעזור בפיתוח מוצר חדש.
 
 תהליך מומלץ:
 1. מחקר שוק - בדוק צרכי לקוחות
@@ -30,9 +35,10 @@ def get_response(prompt: str) -> str:
 5. שיפורים - תקן בעיות
 
 האם תרצה שאעמיק באחד מהשלבים?"""
-
-    elif any(word in prompt_lower for word in ['שיווק', 'דיגיטלי', 'קמפיין']):
-        return """שלום! קמפיין שיווק דיגיטלי הוא דרך מצוינת להגיע ללקוחות.
+    },
+    "שיווק": {
+        "keywords": ["שיווק", "דיגיטלי", "קמפיין"],
+        "response": """שלום! קמפיין שיווק דיגיטלי הוא דרך מצוינת להגיע ללקוחות.
 
 אסטרטגיה מומלצת:
 1. הגדרת יעדים - מה אתה רוצה להשיג?
@@ -42,9 +48,10 @@ def get_response(prompt: str) -> str:
 5. מדידה ומעקב - עקוב אחר תוצאות
 
 איזה ערוץ שיווק מעניין אותך?"""
-
-    elif any(word in prompt_lower for word in ['צוות', 'ניהול', 'יעיל']):
-        return """שלום! ניהול צוות יעיל הוא מפתח להצלחה עסקית.
+    },
+    "צוות": {
+        "keywords": ["צוות", "ניהול", "יעיל"],
+        "response": """שלום! ניהול צוות יעיל הוא מפתח להצלחה עסקית.
 
 עקרונות חשובים:
 1. תקשורת ברורה - הגדר ציפיות ותפקידים
@@ -54,9 +61,19 @@ def get_response(prompt: str) -> str:
 5. פיתוח אישי - השקע בהכשרה
 
 איך אתה רואה את האתגרים בניהול הצוות?"""
+    }
+}
+intent_engine = IntentEngine(INTENTS, "first", path=os.getenv("INTENTS_FILE"))
+pacer = Pacer(MOCK_TOKENS_PER_SECOND)
+pacer.warm(intent["response"] for intent in INTENTS.values())
+
+def get_response(prompt: str) -> str:
+    """Generate Hebrew responses based on keywords"""
+    match = intent_engine.match(prompt)
+    if match:
+        return match.response
 
-    else:
-        return f"""שלום! אני העוזר הארגוני החכם שלך.
+    return f"""שלום! אני העוזר הארגוני החכם שלך.
 
 אני כאן לעזור עם:
 💡 פיתוח מוצרים ושירותים
@@ -69,11 +86,9 @@ def get_response(prompt: str) -> str:
 איך אני יכול לעזור לך? נסה לשאול על אחד מהתחומים האלה."""
 
 async def stream_response(text: str):
-    """Stream response word by word"""
-    words = text.split(' ')
-    for i, word in enumerate(words):
-        yield word + (' ' if i < len(words) - 1 else '')
-        await asyncio.sleep(0.1)
+    """Stream response word by word at the configured pace"""
+    async for chunk in pacer.stream(text):
+        yield chunk
 
 @app.get("/")
 async def root():
@@ -81,7 +96,7 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy", "service": "Simple Chat API"}
+    return {"status": "healthy", "service": "Simple Chat API", "pacing": pacer.describe()}
 
 @app.post("/chat")
 async def chat(data: dict):
@@ -0,0 +1,114 @@
+"""
+Two-tier embedding cache
+In-process LRU in front of a shared Redis tier, keyed by a hash of the normalised text + model name
+"""
+
+import hashlib
+import logging
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+import numpy as np
+from prometheus_client import Counter, Gauge
+
+# ----- Config -----
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "10000"))
+EMBEDDING_CACHE_TTL = int(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", "604800"))  # 7 days
+
+# ----- Prometheus Metrics -----
+EMBEDDING_CACHE_HITS = Counter('embedding_cache_hits_total', 'Embedding cache hits', ['tier'])
+EMBEDDING_CACHE_MISSES = Counter('embedding_cache_misses_total', 'Embeddings computed after missing both tiers')
+EMBEDDING_CACHE_EVICTIONS = Counter('embedding_cache_evictions_total', 'Entries evicted from the local LRU')
+EMBEDDING_CACHE_ERRORS = Counter('embedding_cache_redis_errors_total', 'Failed Redis tier operations', ['op'])
+EMBEDDING_CACHE_SIZE = Gauge('embedding_cache_local_entries', 'Entries held in the local LRU')
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """NFKC, lower-case and collapse whitespace so trivially different prompts share a key"""
+    text = unicodedata.normalize("NFKC", text)
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+class EmbeddingCache:
+    """LRU (per process) + Redis (shared) cache of float32 embedding vectors"""
+
+    def __init__(self, model_name: str, redis_client=None,
+                 max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+                 ttl: int = EMBEDDING_CACHE_TTL):
+        self.model_name = model_name
+        self.redis_client = redis_client
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    def key(self, text: str) -> str:
+        digest = hashlib.sha256(f"{self.model_name}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+        return f"emb:{self.model_name}:{digest}"
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+            EMBEDDING_CACHE_EVICTIONS.inc()
+        EMBEDDING_CACHE_SIZE.set(len(self._lru))
+
+    async def get(self, text: str) -> Optional[np.ndarray]:
+        key = self.key(text)
+        vector = self._lru.get(key)
+        if vector is not None:
+            self._lru.move_to_end(key)
+            EMBEDDING_CACHE_HITS.labels(tier="local").inc()
+            return vector
+
+        if self.redis_client is not None:
+            try:
+                data = await self.redis_client.get(key)
+            except Exception as e:
+                EMBEDDING_CACHE_ERRORS.labels(op="get").inc()
+                logger.warning(f"Embedding cache Redis get failed: {e}")
+                data = None
+            if data:
+                vector = np.frombuffer(data, dtype="<f4")
+                self._remember(key, vector)
+                EMBEDDING_CACHE_HITS.labels(tier="redis").inc()
+                return vector
+        return None
+
+    async def put(self, text: str, vector: np.ndarray):
+        key = self.key(text)
+        vector = np.ascontiguousarray(vector, dtype="<f4")
+        vector.setflags(write=False)
+        self._remember(key, vector)
+        if self.redis_client is not None:
+            try:
+                await self.redis_client.set(key, vector.tobytes(), ex=self.ttl)
+            except Exception as e:
+                EMBEDDING_CACHE_ERRORS.labels(op="set").inc()
+                logger.warning(f"Embedding cache Redis set failed: {e}")
+
+    async def get_or_compute(self, text: str,
+                             compute: Callable[[str], Awaitable[np.ndarray]]) -> np.ndarray:
+        """Return the cached vector or compute, store and return it"""
+        vector = await self.get(text)
+        if vector is not None:
+            return vector
+        EMBEDDING_CACHE_MISSES.inc()
+        vector = await compute(text)
+        await self.put(text, vector)
+        return vector
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model_name,
+            "local_entries": len(self._lru),
+            "max_entries": self.max_entries,
+            "redis": self.redis_client is not None,
+        }
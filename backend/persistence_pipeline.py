@@ -0,0 +1,169 @@
+"""
+Conversation persistence pipeline
+One bounded queue and worker per sink; each worker batches writes, retries with backoff, caps its
+own concurrency and runs blocking clients in its own thread pool, so a slow sink never delays the others
+"""
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from batch_worker import BatchWorker, backoff_delay
+
+# ----- Config -----
+PERSIST_QUEUE_SIZE = int(os.getenv("PERSIST_QUEUE_SIZE", "10000"))  # per sink
+PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", "50"))
+PERSIST_BATCH_WAIT = float(os.getenv("PERSIST_BATCH_WAIT_MS", "200")) / 1000
+PERSIST_CONCURRENCY = int(os.getenv("PERSIST_CONCURRENCY", "2"))  # batches in flight per sink
+PERSIST_MAX_RETRIES = int(os.getenv("PERSIST_MAX_RETRIES", "5"))
+PERSIST_RETRY_BASE = float(os.getenv("PERSIST_RETRY_BASE_SECONDS", "0.5"))
+PERSIST_RETRY_MAX = float(os.getenv("PERSIST_RETRY_MAX_SECONDS", "30"))
+
+# ----- Prometheus Metrics -----
+PERSIST_QUEUE_DEPTH = Gauge('persistence_queue_depth', 'Records waiting for a sink', ['sink'])
+PERSIST_LAG = Histogram(
+    'persistence_lag_seconds', 'Time from submit() until the sink acknowledged the record', ['sink'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+PERSIST_OLDEST = Gauge('persistence_oldest_pending_seconds', 'Age of the oldest record a sink has not written', ['sink'])
+PERSIST_RECORDS = Counter('persistence_records_total', 'Records by final outcome', ['sink', 'outcome'])
+PERSIST_RETRIES = Counter('persistence_retries_total', 'Failed batch attempts that were retried', ['sink'])
+PERSIST_BATCH_TIME = Histogram('persistence_batch_seconds', 'Duration of one successful batch write', ['sink'])
+PERSIST_BATCH_RECORDS = Histogram(
+    'persistence_batch_records', 'Records per batch write', ['sink'],
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500)
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SinkWorker(BatchWorker):
+    """Queue, batcher and writer for one sink.
+
+    `write_batch(records)` persists a list of records. With `blocking=True`
+    it is a plain function run on this sink's thread pool; otherwise it is a
+    coroutine function. Up to `concurrency` batches are written at once. A
+    batch that still fails after `max_retries` retries is dropped and counted.
+    """
+
+    items_metric = PERSIST_RECORDS
+    depth_metric = PERSIST_QUEUE_DEPTH
+
+    def __init__(self, name: str, write_batch: Callable[[List[Dict]], Any], blocking: bool = False,
+                 queue_size: int = PERSIST_QUEUE_SIZE,
+                 batch_size: int = PERSIST_BATCH_SIZE,
+                 batch_wait: float = PERSIST_BATCH_WAIT,
+                 concurrency: int = PERSIST_CONCURRENCY,
+                 max_retries: int = PERSIST_MAX_RETRIES,
+                 retry_base: float = PERSIST_RETRY_BASE,
+                 retry_max: float = PERSIST_RETRY_MAX):
+        super().__init__(name, batch_size, batch_wait, queue_size)
+        self.write_batch = write_batch
+        self.blocking = blocking
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._inflight: Dict[asyncio.Task, float] = {}  # batch task -> oldest submit time
+        self._executor = (ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=f"persist-{name}")
+                          if blocking else None)
+
+    async def close(self):
+        """Write everything already queued, then stop"""
+        await super().close()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def submit(self, record: Dict) -> bool:
+        """Queue one record; never blocks"""
+        return self.add((time.time(), record))
+
+    async def _flush(self, batch: List[Tuple[float, Dict]]):
+        # Wait for a free slot here, so a slow sink backs up its own queue only
+        await self._slots.acquire()
+        task = asyncio.create_task(self._write(batch))
+        self._inflight[task] = batch[0][0]
+        task.add_done_callback(self._done)
+        self._update_oldest()
+
+    def _done(self, task: asyncio.Task):
+        self._inflight.pop(task, None)
+        self._slots.release()
+        self._update_oldest()
+
+    def _update_oldest(self):
+        oldest = min(self._inflight.values(), default=None)
+        PERSIST_OLDEST.labels(sink=self.name).set(time.time() - oldest if oldest else 0.0)
+
+    async def _call(self, records: List[Dict]):
+        if self.blocking:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self.write_batch, records)
+        else:
+            await self.write_batch(records)
+
+    async def _write(self, batch: List[Tuple[float, Dict]]):
+        records = [record for _, record in batch]
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                await self._call(records)
+                break
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self._count("failed", len(records))
+                    logger.error(f"Persistence sink {self.name} dropped {len(records)} records "
+                                 f"after {attempt + 1} attempts: {e}")
+                    return
+                PERSIST_RETRIES.labels(sink=self.name).inc()
+                delay = backoff_delay(attempt, self.retry_base, self.retry_max)
+                logger.warning(f"Persistence sink {self.name} write failed ({e}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+        now = time.time()
+        PERSIST_BATCH_TIME.labels(sink=self.name).observe(time.perf_counter() - start)
+        PERSIST_BATCH_RECORDS.labels(sink=self.name).observe(len(records))
+        self._count("written", len(records))
+        for submitted, _ in batch:
+            PERSIST_LAG.labels(sink=self.name).observe(now - submitted)
+
+    def stats(self) -> Dict:
+        oldest = min(self._inflight.values(), default=None)
+        return {
+            **super().stats(),
+            "batches_in_flight": len(self._inflight),
+            "oldest_pending_seconds": time.time() - oldest if oldest else 0.0,
+        }
+
+
+class PersistencePipeline:
+    """Fans each record out to every registered sink"""
+
+    def __init__(self):
+        self.sinks: Dict[str, SinkWorker] = {}
+
+    def add_sink(self, name: str, write_batch: Callable[[List[Dict]], Any], blocking: bool = False,
+                 **options) -> SinkWorker:
+        """Register a sink; `options` override the PERSIST_* defaults for this sink only"""
+        worker = self.sinks[name] = SinkWorker(name, write_batch, blocking=blocking, **options)
+        return worker
+
+    async def start(self):
+        for worker in self.sinks.values():
+            await worker.start()
+
+    async def close(self):
+        await asyncio.gather(*[worker.close() for worker in self.sinks.values()])
+
+    def submit(self, record: Dict) -> Dict[str, bool]:
+        return {name: worker.submit(record) for name, worker in self.sinks.items()}
+
+    def stats(self) -> Dict:
+        return {name: worker.stats() for name, worker in self.sinks.items()}
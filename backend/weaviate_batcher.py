@@ -0,0 +1,180 @@
+"""
+Batched Weaviate ingestion
+Objects are imported through the batch API instead of one data_object.create per object;
+the async writer flushes on size or time, sizes batches from observed latency and reports
+per-object errors without failing the rest of the batch
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from batch_worker import BatchWorker, backoff_delay
+
+# ----- Config -----
+WEAVIATE_BATCH_SIZE = int(os.getenv("WEAVIATE_BATCH_SIZE", "50"))  # starting size
+WEAVIATE_BATCH_MIN = int(os.getenv("WEAVIATE_BATCH_MIN", "10"))
+WEAVIATE_BATCH_MAX = int(os.getenv("WEAVIATE_BATCH_MAX", "500"))
+WEAVIATE_BATCH_INTERVAL = float(os.getenv("WEAVIATE_BATCH_INTERVAL_MS", "500")) / 1000
+WEAVIATE_BATCH_TARGET = float(os.getenv("WEAVIATE_BATCH_TARGET_MS", "1000")) / 1000
+WEAVIATE_BATCH_QUEUE_SIZE = int(os.getenv("WEAVIATE_BATCH_QUEUE_SIZE", "10000"))
+WEAVIATE_BATCH_MAX_RETRIES = int(os.getenv("WEAVIATE_BATCH_MAX_RETRIES", "3"))
+
+# ----- Prometheus Metrics -----
+WEAVIATE_OBJECTS = Counter('weaviate_batch_objects_total', 'Objects by import outcome', ['name', 'outcome'])
+WEAVIATE_BATCH_TIME = Histogram(
+    'weaviate_batch_seconds', 'Duration of one batch import request', ['name'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+WEAVIATE_BATCH_LIMIT = Gauge('weaviate_batch_size_limit', 'Current dynamic batch size', ['name'])
+WEAVIATE_QUEUE_DEPTH = Gauge('weaviate_batch_queue_depth', 'Objects waiting to be imported', ['name'])
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WeaviateObject:
+    properties: Dict
+    class_name: str
+    vector: Optional[List[float]] = None
+    uuid: Optional[str] = None
+
+
+def _object_error(result: Dict) -> Optional[str]:
+    errors = (result or {}).get("result", {}).get("errors")
+    if not errors:
+        return None
+    return "; ".join(e.get("message", str(e)) for e in errors.get("error", [])) or str(errors)
+
+
+class WeaviateImporter:
+    """Synchronous batch import on a shared client.
+
+    The client's batch buffer is one object per client, so imports are
+    serialised with a lock and may be called from any thread.
+    """
+
+    def __init__(self, client, name: str = "default", recent_errors: int = 20):
+        self.client = client
+        self.name = name
+        self.recent_errors: deque = deque(maxlen=recent_errors)
+        self._lock = threading.Lock()
+
+    def import_objects(self, objects: List[WeaviateObject]) -> List[Tuple[WeaviateObject, str]]:
+        """Import `objects` in one request; returns the objects Weaviate rejected, with reasons.
+
+        Raises only when the request itself fails, in which case nothing is
+        known to be written and the whole batch can be retried.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            # A request that raised leaves its objects in the buffer; never send them twice
+            self.client.batch.empty_objects()
+            for obj in objects:
+                self.client.batch.add_data_object(obj.properties, obj.class_name, uuid=obj.uuid, vector=obj.vector)
+            results = self.client.batch.create_objects() or []
+        WEAVIATE_BATCH_TIME.labels(name=self.name).observe(time.perf_counter() - start)
+
+        failed = []
+        for obj, result in zip(objects, results):
+            error = _object_error(result)
+            if error:
+                failed.append((obj, error))
+                self.recent_errors.append({"class": obj.class_name, "uuid": obj.uuid, "error": error})
+        if failed:
+            WEAVIATE_OBJECTS.labels(name=self.name, outcome="rejected").inc(len(failed))
+            logger.warning(f"Weaviate rejected {len(failed)}/{len(objects)} objects: {failed[0][1]}")
+        WEAVIATE_OBJECTS.labels(name=self.name, outcome="imported").inc(len(objects) - len(failed))
+        return failed
+
+
+class WeaviateBatcher(BatchWorker):
+    """Non-blocking writer that imports queued objects in batches off the event loop.
+
+    A batch is sent when `batch_size` objects are queued or `interval` seconds
+    after the first one. The batch size grows while imports finish under
+    `target_latency` and halves when they do not.
+    """
+
+    items_metric = WEAVIATE_OBJECTS
+    depth_metric = WEAVIATE_QUEUE_DEPTH
+
+    def __init__(self, client, name: str = "default",
+                 batch_size: int = WEAVIATE_BATCH_SIZE,
+                 min_batch: int = WEAVIATE_BATCH_MIN,
+                 max_batch: int = WEAVIATE_BATCH_MAX,
+                 interval: float = WEAVIATE_BATCH_INTERVAL,
+                 target_latency: float = WEAVIATE_BATCH_TARGET,
+                 queue_size: int = WEAVIATE_BATCH_QUEUE_SIZE,
+                 max_retries: int = WEAVIATE_BATCH_MAX_RETRIES,
+                 on_error: Optional[Callable[[WeaviateObject, str], None]] = None):
+        self.min_batch = max(1, min_batch)
+        self.max_batch = max(self.min_batch, max_batch)
+        super().__init__(name, min(max(batch_size, self.min_batch), self.max_batch), interval, queue_size)
+        self.importer = WeaviateImporter(client, name)
+        self.target_latency = target_latency
+        self.max_retries = max_retries
+        self.on_error = on_error
+        # One thread: imports for this writer never overlap
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"weaviate-{name}")
+        self._last_latency = 0.0
+        WEAVIATE_BATCH_LIMIT.labels(name=name).set(self.batch_size)
+
+    async def close(self):
+        """Import everything already queued, then stop"""
+        await super().close()
+        self._executor.shutdown(wait=True)
+
+    def add(self, properties: Dict, class_name: str, vector: Optional[List[float]] = None,
+            uuid: Optional[str] = None) -> bool:
+        """Queue one object; never blocks"""
+        return super().add(WeaviateObject(properties, class_name, vector, uuid))
+
+    def _resize(self, count: int, latency: float):
+        """Additive increase while under the latency target, multiplicative decrease above it"""
+        self._last_latency = latency
+        if latency > self.target_latency:
+            self.batch_size = max(self.min_batch, self.batch_size // 2)
+        elif count >= self.batch_size:
+            # Only grow when full batches are still fast
+            self.batch_size = min(self.max_batch, self.batch_size + max(1, self.batch_size // 4))
+        WEAVIATE_BATCH_LIMIT.labels(name=self.name).set(self.batch_size)
+
+    async def _flush(self, batch: List[WeaviateObject]):
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                failed = await loop.run_in_executor(self._executor, self.importer.import_objects, batch)
+            except Exception as e:
+                self._resize(len(batch), time.perf_counter() - start)
+                if attempt == self.max_retries:
+                    self._count("failed", len(batch))
+                    logger.error(f"Weaviate batcher {self.name} dropped {len(batch)} objects "
+                                 f"after {attempt + 1} attempts: {e}")
+                    return
+                delay = backoff_delay(attempt)
+                logger.warning(f"Weaviate batch import failed ({e}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            self._resize(len(batch), time.perf_counter() - start)
+            if self.on_error is not None:
+                for obj, error in failed:
+                    self.on_error(obj, error)
+            return
+
+    def stats(self) -> Dict:
+        return {
+            **super().stats(),
+            "last_batch_seconds": round(self._last_latency, 4),
+            "recent_errors": list(self.importer.recent_errors),
+        }
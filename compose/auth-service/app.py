@@ -8,7 +8,11 @@ import redis.asyncio as redis
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
-import bcrypt
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from starlette.responses import Response
+
+from password_hasher import HasherBusy, PasswordHasher
+from token_cache import TokenCache
 
 # Configuration
 JWT_SECRET = os.getenv("JWT_SECRET", "your-secret-key")
@@ -18,9 +22,11 @@ REDIS_URL = os.getenv("REDIS_URL", "redis://:password@redis:6379/1")
 
 app = FastAPI(title="Enterprise Auth Service")
 security = HTTPBearer()
+token_cache = TokenCache(JWT_SECRET, [JWT_ALGORITHM])
 
 # Global Redis connection
 rds = None
+password_hasher = PasswordHasher()
 
 class UserLogin(BaseModel):
     username: str
@@ -42,19 +48,28 @@ class TokenResponse(BaseModel):
 async def startup():
     global rds
     rds = await redis.from_url(REDIS_URL, decode_responses=True)
+    await password_hasher.start()
 
 @app.on_event("shutdown")
 async def shutdown():
+    await password_hasher.close()
     await rds.close()
 
-def hash_password(password: str) -> str:
-    """Hash password using bcrypt"""
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+async def hash_password(password: str) -> str:
+    """Hash password using bcrypt (process pool)"""
+    try:
+        return await password_hasher.hash(password)
+    except HasherBusy as e:
+        raise HTTPException(status_code=503, detail="Server busy, try again later",
+                            headers={"Retry-After": str(e.retry_after)})
 
-def verify_password(password: str, hashed: str) -> bool:
-    """Verify password against hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+async def verify_password(password: str, hashed: str) -> bool:
+    """Verify password against hash (process pool)"""
+    try:
+        return await password_hasher.verify(password, hashed)
+    except HasherBusy as e:
+        raise HTTPException(status_code=503, detail="Server busy, try again later",
+                            headers={"Retry-After": str(e.retry_after)})
 
 def create_token(user_id: str, username: str, organization: str) -> str:
     """Create JWT token"""
@@ -68,11 +83,10 @@ def create_token(user_id: str, username: str, organization: str) -> str:
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Verify JWT token"""
     try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload
+        return token_cache.verify(credentials.credentials)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
@@ -88,7 +102,7 @@ async def register(user_data: UserRegister):
     
     # Create user
     user_id = f"user_{int(time.time())}"
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     
     user_info = {
         "user_id": user_id,
@@ -124,7 +138,7 @@ async def login(user_data: UserLogin):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     # Verify password
-    if not verify_password(user_data.password, user_info["password_hash"]):
+    if not await verify_password(user_data.password, user_info["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     # Check if user is active
@@ -160,10 +174,12 @@ async def verify_token_endpoint(user: dict = Depends(verify_token)):
     }
 
 @app.post("/logout")
-async def logout(user: dict = Depends(verify_token)):
+async def logout(user: dict = Depends(verify_token),
+                 credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Logout user (invalidate token)"""
-    # In production, you might want to maintain a blacklist of tokens
-    # For now, we'll just return success since JWT is stateless
+    # Rejected by this service until it expires; other services still need
+    # a shared blacklist plugged into TokenCache.is_revoked
+    token_cache.revoke(credentials.credentials)
     return {"message": "Logged out successfully"}
 
 @app.get("/users/me")
@@ -185,11 +201,16 @@ async def get_current_user(user: dict = Depends(verify_token)):
         "is_active": user_info.get("is_active", "True")
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     try:
         await rds.ping()
-        return {"status": "healthy", "service": "auth"}
+        return {"status": "healthy", "service": "auth", "password_hasher": password_hasher.stats()}
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Service unhealthy: {e}")
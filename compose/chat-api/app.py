@@ -1,12 +1,18 @@
-import os, json, time, uuid
+import os
 from datetime import datetime, timezone
 from typing import AsyncGenerator, List, Dict
 
-import httpx
 import boto3
 import redis.asyncio as redis
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import StreamingResponse
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from starlette.responses import Response
+
+from archive_writer import ArchiveWriter
+from ollama_client import OllamaClient, OllamaError
+from session_store import SessionStore
+from token_stream import FlushPolicy, coalesce_chunks
 
 # ----- קונפיג -----
 REDIS_URL = os.getenv("REDIS_URL","redis://:password@redis:6379/0")
@@ -17,18 +23,23 @@ MINIO_ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY","admin")
 MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY","password")
 S3_BUCKET = os.getenv("S3_BUCKET","chat-archive")
 SESSION_TTL = int(os.getenv("SESSION_TTL_SECONDS","259200"))  # 3 ימים
+CHAT_FLUSH = FlushPolicy.from_env("chat")  # STREAM_FLUSH_BYTES_CHAT / STREAM_FLUSH_INTERVAL_MS_CHAT
 
 app = FastAPI(title="Org Chat POC")
 rds = None
 s3 = None
+archiver = None
+sessions = None
+ollama = OllamaClient(OLLAMA_URL)
 
 def _ts():
     return datetime.now(timezone.utc).isoformat()
 
 @app.on_event("startup")
 async def startup():
-    global rds, s3
+    global rds, s3, archiver, sessions
     rds = await redis.from_url(REDIS_URL, decode_responses=True)
+    sessions = SessionStore(rds, ttl=SESSION_TTL)
     s3 = boto3.client(
         "s3",
         endpoint_url=MINIO_ENDPOINT,
@@ -41,38 +52,41 @@ async def startup():
         s3.head_bucket(Bucket=S3_BUCKET)
     except Exception:
         s3.create_bucket(Bucket=S3_BUCKET)
+    archiver = ArchiveWriter(s3, S3_BUCKET)
+    await archiver.start()
+    await ollama.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await ollama.close()
+    await archiver.close()
+    await rds.close()
+
+@app.get("/metrics")
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 async def get_ctx(session_id: str) -> List[Dict]:
-    data = await rds.get(f"sess:{session_id}")
-    return json.loads(data) if data else []
+    messages, _ = await sessions.load(session_id)
+    return messages
 
-async def set_ctx(session_id: str, messages: List[Dict]):
-    await rds.set(f"sess:{session_id}", json.dumps(messages), ex=SESSION_TTL)
+async def append_ctx(session_id: str, messages: List[Dict]):
+    # רק ההודעות החדשות נוספות לרשימה, בלי לכתוב מחדש את כל השיחה
+    await sessions.append(session_id, messages)
 
 def archive_message(session_id: str, payload: Dict):
-    key = f"conversations/{session_id}/{int(time.time()*1000)}-{uuid.uuid4().hex}.json"
-    s3.put_object(Bucket=S3_BUCKET, Key=key, Body=json.dumps(payload).encode("utf-8"))
+    # נכתב ל-MinIO ברקע כמקטעי NDJSON דחוסים
+    archiver.submit(session_id, payload)
 
 async def ollama_stream(messages: List[Dict]) -> AsyncGenerator[str, None]:
-    url = f"{OLLAMA_URL}/api/chat"
-    async with httpx.AsyncClient(timeout=60) as client:
-        req = {"model": OLLAMA_MODEL, "messages": messages, "stream": True}
-        async with client.stream("POST", url, json=req) as resp:
-            if resp.status_code != 200:
-                text = await resp.aread()
-                raise HTTPException(500, f"ollama error: {text.decode('utf-8','ignore')}")
-            async for line in resp.aiter_lines():
-                if not line:
-                    continue
-                try:
-                    obj = json.loads(line)
-                except Exception:
-                    continue
-                # פורמט הזרם של ollama: {"message":{"role":"assistant","content":"..."},"done":false}
-                if "message" in obj and "content" in obj["message"]:
-                    yield obj["message"]["content"]
-                if obj.get("done"):
-                    break
+    req = {"model": OLLAMA_MODEL, "messages": messages, "stream": True}
+    try:
+        async for obj in ollama.stream("/api/chat", req):
+            # פורמט הזרם של ollama: {"message":{"role":"assistant","content":"..."},"done":false}
+            if "message" in obj and "content" in obj["message"]:
+                yield obj["message"]["content"]
+    except OllamaError as e:
+        raise HTTPException(500, f"ollama error: {e.detail}")
 
 @app.post("/chat")
 async def chat(body: Dict):
@@ -89,15 +103,15 @@ async def chat(body: Dict):
     archive_message(session_id, {"ts":_ts(),"role":"user","content":prompt})
 
     async def gen():
-        assistant_text = ""
+        parts: List[str] = []
         try:
-            async for chunk in ollama_stream(new_ctx):
-                assistant_text += chunk
-                yield chunk
+            # טוקנים מקובצים לחתיכות HTTP גדולות יותר; הטקסט המלא מורכב פעם אחת
+            async for data in coalesce_chunks(ollama_stream(new_ctx), CHAT_FLUSH, collect=parts):
+                yield data
         finally:
+            assistant_text = "".join(parts)
             # עדכון זיכרון קצר + ארכוב תשובת העוזר
-            ctx2 = ctx + [{"role":"user","content":prompt},{"role":"assistant","content":assistant_text}]
-            await set_ctx(session_id, ctx2)
+            await append_ctx(session_id, [{"role":"user","content":prompt},{"role":"assistant","content":assistant_text}])
             archive_message(session_id, {"ts":_ts(),"role":"assistant","content":assistant_text})
 
     return StreamingResponse(gen(), media_type="text/plain")
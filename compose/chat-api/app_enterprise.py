@@ -1,4 +1,4 @@
-import os, json, time, uuid, asyncio
+import os, time, asyncio
 from datetime import datetime, timezone
 from typing import AsyncGenerator, List, Dict, Optional
 from contextlib import asynccontextmanager
@@ -6,16 +6,23 @@ from contextlib import asynccontextmanager
 import httpx
 import boto3
 import redis.asyncio as redis
-from fastapi import FastAPI, HTTPException, Depends, Request, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
 import jwt
 from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
 from starlette.responses import Response
 import logging
 
+from archive_writer import ArchiveWriter
+from ollama_client import OllamaClient, OllamaError
+from rate_limiter import RateLimiter
+from session_store import SessionStore
+from single_flight import SingleFlight, flight_key
+from token_stream import FlushPolicy, StreamingGZipMiddleware, coalesce_chunks
+from token_cache import TokenCache
+
 # ----- קונפיג -----
 REDIS_URL = os.getenv("REDIS_URL", "redis://:password@redis:6379/0")
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://ollama:11434")
@@ -26,9 +33,11 @@ MINIO_ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY", "admin")
 MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY", "password")
 S3_BUCKET = os.getenv("S3_BUCKET", "chat-archive")
 SESSION_TTL = int(os.getenv("SESSION_TTL_SECONDS", "259200"))  # 3 ימים
+SESSION_CONTEXT_TURNS = int(os.getenv("SESSION_CONTEXT_TURNS", "0"))  # 0 = whole session
 INSTANCE_ID = os.getenv("INSTANCE_ID", "api-1")
 RATE_LIMIT_PER_MINUTE = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
 JWT_SECRET = os.getenv("JWT_SECRET", "your-secret-key")
+CHAT_FLUSH = FlushPolicy.from_env("chat")  # STREAM_FLUSH_BYTES_CHAT / STREAM_FLUSH_INTERVAL_MS_CHAT
 
 # ----- Prometheus Metrics -----
 REQUEST_COUNT = Counter('chat_requests_total', 'Total chat requests', ['instance', 'status'])
@@ -42,13 +51,21 @@ logger = logging.getLogger(__name__)
 # ----- Global Variables -----
 rds = None
 s3 = None
+archiver = None
+sessions = None
+rate_limiter = RateLimiter(name="chat")
+ollama = OllamaClient(OLLAMA_URL)
+generations = SingleFlight("chat")
 security = HTTPBearer()
+token_cache = TokenCache(JWT_SECRET, ["HS256"])
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    global rds, s3
+    global rds, s3, archiver, sessions
     rds = await redis.from_url(REDIS_URL, decode_responses=True)
+    sessions = SessionStore(rds, ttl=SESSION_TTL)
+    rate_limiter.redis_client = rds
     s3 = boto3.client(
         "s3",
         endpoint_url=MINIO_ENDPOINT,
@@ -61,11 +78,16 @@ async def lifespan(app: FastAPI):
         s3.head_bucket(Bucket=S3_BUCKET)
     except Exception:
         s3.create_bucket(Bucket=S3_BUCKET)
+    archiver = ArchiveWriter(s3, S3_BUCKET, instance_id=INSTANCE_ID)
+    await archiver.start()
+    await ollama.start()
     
     logger.info(f"🚀 Enterprise Chat API {INSTANCE_ID} started successfully")
     yield
     
     # Shutdown
+    await ollama.close()
+    await archiver.close()
     await rds.close()
     logger.info(f"🛑 Enterprise Chat API {INSTANCE_ID} shutdown")
 
@@ -84,7 +106,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+# /chat streams tokens; gzip would hold them back until its buffer fills
+app.add_middleware(StreamingGZipMiddleware, minimum_size=1000, skip_paths=("/chat",))
 
 def _ts():
     return datetime.now(timezone.utc).isoformat()
@@ -92,8 +115,7 @@ def _ts():
 # ----- Authentication -----
 async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=["HS256"])
-        return payload
+        return token_cache.verify(credentials.credentials)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
@@ -101,88 +123,62 @@ async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(secur
 
 # ----- Rate Limiting -----
 async def check_rate_limit(user_id: str, request: Request):
-    key = f"rate_limit:{user_id}"
-    current = await rds.get(key)
-    
-    if current is None:
-        await rds.setex(key, 60, 1)
-        return True
-    
-    if int(current) >= RATE_LIMIT_PER_MINUTE:
-        raise HTTPException(status_code=429, detail="Rate limit exceeded")
-    
-    await rds.incr(key)
+    # Atomic sliding window in Redis; most checks are served from a local lease
+    await rate_limiter.check(f"user:{user_id}", RATE_LIMIT_PER_MINUTE, 60)
     return True
 
 # ----- Session Management -----
-async def get_ctx(session_id: str) -> List[Dict]:
-    data = await rds.get(f"sess:{session_id}")
-    return json.loads(data) if data else []
+SYSTEM_PROMPT = {"role": "system", "content": """אתה עוזר ארגוני חכם ומועיל בעברית. 
+
+תפקידך:
+- לענות על שאלות עסקיות, טכנולוגיות וניהוליות
+- לתת עצות מעשיות וקונקרטיות
+- להיות מקצועי, ידידותי ומועיל
+- לענות בעברית בלבד
+- לתת תשובות ברורות וממוקדות
+- לשאול שאלות הבהרה כשצריך
 
-async def set_ctx(session_id: str, messages: List[Dict]):
-    await rds.setex(f"sess:{session_id}", SESSION_TTL, json.dumps(messages))
+תמיד התחל את התשובה בברכה קצרה ותן מידע רלוונטי ומעשי."""}
 
-async def get_session_metadata(session_id: str) -> Dict:
-    data = await rds.get(f"meta:{session_id}")
-    return json.loads(data) if data else {"created_at": _ts(), "message_count": 0}
+async def get_ctx(session_id: str, last_turns: Optional[int] = None) -> List[Dict]:
+    """Stored user/assistant messages; the system prompt is added per request"""
+    messages, _ = await sessions.load(session_id, last_turns)
+    return [m for m in messages if m.get("role") != "system"]
 
-async def update_session_metadata(session_id: str, metadata: Dict):
-    await rds.setex(f"meta:{session_id}", SESSION_TTL, json.dumps(metadata))
+async def append_turn(session_id: str, user_content: str, assistant_content: str):
+    """Append one exchange and bump the session metadata in a single round trip"""
+    await sessions.append(session_id, [
+        {"role": "user", "content": user_content},
+        {"role": "assistant", "content": assistant_content}
+    ])
 
 # ----- Archive System -----
 def archive_message(session_id: str, payload: Dict):
-    try:
-        key = f"conversations/{session_id}/{int(time.time()*1000)}-{uuid.uuid4().hex}.json"
-        s3.put_object(
-            Bucket=S3_BUCKET, 
-            Key=key, 
-            Body=json.dumps(payload).encode("utf-8"),
-            Metadata={
-                "timestamp": _ts(),
-                "session_id": session_id,
-                "instance_id": INSTANCE_ID
-            }
-        )
-    except Exception as e:
-        logger.error(f"Archive failed: {e}")
+    """Hand the message to the write-behind archiver (never blocks the request)"""
+    archiver.submit(session_id, payload)
 
 # ----- AI Integration -----
 async def ollama_stream(messages: List[Dict], model: str = None) -> AsyncGenerator[str, None]:
     model = model or OLLAMA_MODEL
-    url = f"{OLLAMA_URL}/api/chat"
-    
-    async with httpx.AsyncClient(timeout=120) as client:
-        req = {
-            "model": model, 
-            "messages": messages, 
-            "stream": True,
-            "options": {
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "num_predict": 1000
-            }
+    req = {
+        "model": model, 
+        "messages": messages, 
+        "stream": True,
+        "options": {
+            "temperature": 0.7,
+            "top_p": 0.9,
+            "num_predict": 1000
         }
-        
-        try:
-            async with client.stream("POST", url, json=req) as resp:
-                if resp.status_code != 200:
-                    text = await resp.aread()
-                    raise HTTPException(500, f"ollama error: {text.decode('utf-8','ignore')}")
-                
-                async for line in resp.aiter_lines():
-                    if not line:
-                        continue
-                    try:
-                        obj = json.loads(line)
-                    except Exception:
-                        continue
-                    
-                    if "message" in obj and "content" in obj["message"]:
-                        yield obj["message"]["content"]
-                    if obj.get("done"):
-                        break
-        except httpx.TimeoutException:
-            raise HTTPException(504, "AI service timeout")
+    }
+    
+    try:
+        async for obj in ollama.stream("/api/chat", req):
+            if "message" in obj and "content" in obj["message"]:
+                yield obj["message"]["content"]
+    except OllamaError as e:
+        raise HTTPException(500, f"ollama error: {e.detail}")
+    except httpx.TimeoutException:
+        raise HTTPException(504, "AI service timeout")
 
 # ----- Health Check -----
 @app.get("/health")
@@ -199,7 +195,10 @@ async def health_check():
             "services": {
                 "redis": "ok",
                 "minio": "ok"
-            }
+            },
+            "ollama_pool": ollama.stats(),
+            "coalescing": generations.stats(),
+            "archive": archiver.stats()
         }
     except Exception as e:
         raise HTTPException(503, f"Service unhealthy: {e}")
@@ -214,7 +213,6 @@ async def metrics():
 async def chat(
     body: Dict,
     request: Request,
-    background_tasks: BackgroundTasks,
     user: dict = Depends(verify_token)
 ):
     start_time = time.time()
@@ -231,47 +229,28 @@ async def chat(
     await check_rate_limit(user_id, request)
     
     # Get session context
-    ctx = await get_ctx(session_id)
-    metadata = await get_session_metadata(session_id)
+    ctx = await get_ctx(session_id, SESSION_CONTEXT_TURNS)
     
-    # Build context with system message
-    if not ctx:
-        ctx = [{"role": "system", "content": """אתה עוזר ארגוני חכם ומועיל בעברית. 
-
-תפקידך:
-- לענות על שאלות עסקיות, טכנולוגיות וניהוליות
-- לתת עצות מעשיות וקונקרטיות
-- להיות מקצועי, ידידותי ומועיל
-- לענות בעברית בלבד
-- לתת תשובות ברורות וממוקדות
-- לשאול שאלות הבהרה כשצריך
-
-תמיד התחל את התשובה בברכה קצרה ותן מידע רלוונטי ומעשי."""}]
-    
-    new_ctx = ctx + [{"role": "user", "content": prompt}]
+    new_ctx = [SYSTEM_PROMPT] + ctx + [{"role": "user", "content": prompt}]
     
     # Archive user message
     user_message = {"ts": _ts(), "role": "user", "content": prompt, "model": model}
-    background_tasks.add_task(archive_message, session_id, user_message)
+    archive_message(session_id, user_message)
+    
+    # Identical prompts over identical context attach to one Ollama generation
+    generation_key = flight_key(prompt, model, new_ctx[:-1])
     
     async def generate_response():
-        assistant_text = ""
+        parts: List[str] = []
         try:
-            async for chunk in ollama_stream(new_ctx, model):
-                assistant_text += chunk
-                yield chunk
+            # Tokens go out in fewer, larger chunks; the full text is joined once at the end
+            tokens = generations.stream(generation_key, lambda: ollama_stream(new_ctx, model))
+            async for data in coalesce_chunks(tokens, CHAT_FLUSH, collect=parts):
+                yield data
         finally:
-            # Update session context
-            ctx2 = ctx + [
-                {"role": "user", "content": prompt},
-                {"role": "assistant", "content": assistant_text}
-            ]
-            await set_ctx(session_id, ctx2)
-            
-            # Update metadata
-            metadata["message_count"] = metadata.get("message_count", 0) + 1
-            metadata["last_activity"] = _ts()
-            await update_session_metadata(session_id, metadata)
+            assistant_text = "".join(parts)
+            # Update session context + metadata
+            await append_turn(session_id, prompt, assistant_text)
             
             # Archive assistant response
             assistant_message = {
@@ -281,7 +260,7 @@ async def chat(
                 "model": model,
                 "response_time": time.time() - start_time
             }
-            background_tasks.add_task(archive_message, session_id, assistant_message)
+            archive_message(session_id, assistant_message)
             
             # Update metrics
             REQUEST_COUNT.labels(instance=INSTANCE_ID, status='success').inc()
@@ -298,9 +277,8 @@ async def chat(
 
 # ----- Session Management -----
 @app.get("/sessions/{session_id}")
-async def get_session(session_id: str, user: dict = Depends(verify_token)):
-    ctx = await get_ctx(session_id)
-    metadata = await get_session_metadata(session_id)
+async def get_session(session_id: str, last_turns: Optional[int] = None, user: dict = Depends(verify_token)):
+    ctx, metadata = await sessions.load(session_id, last_turns)
     
     return {
         "session_id": session_id,
@@ -311,26 +289,22 @@ async def get_session(session_id: str, user: dict = Depends(verify_token)):
 
 @app.delete("/sessions/{session_id}")
 async def delete_session(session_id: str, user: dict = Depends(verify_token)):
-    await rds.delete(f"sess:{session_id}")
-    await rds.delete(f"meta:{session_id}")
+    await sessions.delete(session_id)
     
     return {"message": "Session deleted", "session_id": session_id}
 
 # ----- Analytics -----
 @app.get("/analytics/sessions")
-async def get_session_analytics(user: dict = Depends(verify_token)):
-    # Get session statistics from Redis
-    keys = await rds.keys("meta:*")
-    sessions = []
-    
-    for key in keys[:100]:  # Limit to 100 sessions
-        data = await rds.get(key)
-        if data:
-            sessions.append(json.loads(data))
+async def get_session_analytics(limit: int = 100, cursor: Optional[str] = None,
+                                user: dict = Depends(verify_token)):
+    # Served from the last-activity index; pass next_cursor back to page
+    page = await sessions.recent(min(max(limit, 1), 500), cursor)
     
     return {
-        "total_sessions": len(keys),
-        "recent_sessions": sessions,
+        "total_sessions": page["active_sessions"],
+        "total_created": page["total_created"],
+        "recent_sessions": page["sessions"],
+        "next_cursor": page["next_cursor"],
         "instance": INSTANCE_ID
     }
 
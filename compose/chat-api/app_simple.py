@@ -9,6 +9,12 @@ from fastapi import FastAPI, HTTPException
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 
+from intent_engine import IntentEngine
+from mock_pacing import Pacer
+
+# Mock streaming pace; MOCK_PACING_MODE=none turns the server into a load-test target
+MOCK_TOKENS_PER_SECOND = float(os.getenv("MOCK_TOKENS_PER_SECOND", "20"))
+
 app = FastAPI(title="Simple Org Chat API")
 
 # CORS middleware
@@ -26,14 +32,11 @@ sessions = {}
 def _ts():
     return datetime.now(timezone.utc).isoformat()
 
-def get_mock_response(user_prompt: str) -> str:
-    """Generate a mock intelligent response in Hebrew"""
-    
-    # Simple keyword-based responses
-    prompt_lower = user_prompt.lower()
-    
-    if any(word in prompt_lower for word in ['מוצר', 'פיתוח', 'חדש']):
-        return """שלום! אני שמח לעזור בפיתוח מוצר חדש. 
+# Keyword intents, checked in order (first match wins)
+INTENTS = {
+    "מוצר": {
+        "keywords": ["מוצר", "פיתוח", "חדש"],
+        "response": """שלום! אני שמח לעזור בפיתוח מוצר חדש. 
 
 להלן תהליך מומלץ:
 1. **מחקר שוק** - בדוק את הצרכים של הלקוחות
@@ -43,9 +46,10 @@ def get_mock_response(user_prompt: str) -> str:
 5. **שיפורים** - תקן בעיות ושלם תכונות
 
 האם תרצה שאעמיק באחד מהשלבים?"""
-
-    elif any(word in prompt_lower for word in ['שיווק', 'דיגיטלי', 'קמפיין']):
-        return """שלום! קמפיין שיווק דיגיטלי הוא דרך מצוינת להגיע ללקוחות.
+    },
+    "שיווק": {
+        "keywords": ["שיווק", "דיגיטלי", "קמפיין"],
+        "response": """שלום! קמפיין שיווק דיגיטלי הוא דרך מצוינת להגיע ללקוחות.
 
 **אסטרטגיה מומלצת:**
 1. **הגדרת יעדים** - מה אתה רוצה להשיג?
@@ -55,9 +59,10 @@ def get_mock_response(user_prompt: str) -> str:
 5. **מדידה ומעקב** - עקוב אחר התוצאות
 
 איזה ערוץ שיווק מעניין אותך הכי הרבה?"""
-
-    elif any(word in prompt_lower for word in ['צוות', 'ניהול', 'יעיל']):
-        return """שלום! ניהול צוות יעיל הוא מפתח להצלחה עסקית.
+    },
+    "צוות": {
+        "keywords": ["צוות", "ניהול", "יעיל"],
+        "response": """שלום! ניהול צוות יעיל הוא מפתח להצלחה עסקית.
 
 **עקרונות חשובים:**
 1. **תקשורת ברורה** - הגדר ציפיות ותפקידים
@@ -67,9 +72,10 @@ def get_mock_response(user_prompt: str) -> str:
 5. **פיתוח אישי** - השקע בהכשרה והתפתחות
 
 איך אתה רואה את האתגרים הנוכחיים בניהול הצוות?"""
-
-    elif any(word in prompt_lower for word in ['בינה', 'מלאכותית', 'ai', 'טכנולוגיה']):
-        return """שלום! בינה מלאכותית יכולה לשנות את העסק שלך לטובה!
+    },
+    "בינה": {
+        "keywords": ["בינה", "מלאכותית", "ai", "טכנולוגיה"],
+        "response": """שלום! בינה מלאכותית יכולה לשנות את העסק שלך לטובה!
 
 **שימושים עסקיים:**
 1. **אוטומציה** - משימות חוזרות ופשוטות
@@ -79,9 +85,19 @@ def get_mock_response(user_prompt: str) -> str:
 5. **חיזוי** - תחזיות מכירות ומגמות
 
 איזה תחום בעסק שלך הכי מעניין אותך לשפר עם AI?"""
+    }
+}
+intent_engine = IntentEngine(INTENTS, "first", path=os.getenv("INTENTS_FILE"))
+pacer = Pacer(MOCK_TOKENS_PER_SECOND)
+pacer.warm(intent["response"] for intent in INTENTS.values())
 
-    else:
-        return f"""שלום! אני העוזר הארגוני החכם שלך.
+def get_mock_response(user_prompt: str) -> str:
+    """Generate a mock intelligent response in Hebrew"""
+    match = intent_engine.match(user_prompt)
+    if match:
+        return match.response
+
+    return f"""שלום! אני העוזר הארגוני החכם שלך.
 
 אני כאן לעזור לך עם:
 - 💡 פיתוח מוצרים ושירותים
@@ -94,19 +110,17 @@ def get_mock_response(user_prompt: str) -> str:
 
 איך אני יכול לעזור לך באופן ספציפי יותר? נסה לשאול על אחד מהתחומים האלה או ספר לי יותר על האתגר שלך."""
 
-async def mock_stream_response(response_text: str) -> AsyncGenerator[str, None]:
-    """Simulate streaming response by sending chunks"""
-    words = response_text.split(' ')
-    for i, word in enumerate(words):
-        yield word + (' ' if i < len(words) - 1 else '')
-        # Small delay to simulate real streaming
-        await asyncio.sleep(0.05)
+async def mock_stream_response(response_text: str) -> AsyncGenerator[bytes, None]:
+    """Simulate streaming response by sending pre-encoded chunks at the configured pace"""
+    async for chunk in pacer.stream(response_text):
+        yield chunk
 
 @app.get("/health")
 async def health_check():
     return {
         "status": "healthy",
         "service": "Simple Chat API",
+        "pacing": pacer.describe(),
         "timestamp": _ts()
     }
 
@@ -143,12 +157,8 @@ async def chat(body: Dict):
     }
     sessions[session_id].append(assistant_message)
 
-    async def generate_response():
-        async for chunk in mock_stream_response(response_text):
-            yield chunk
-
     return StreamingResponse(
-        generate_response(),
+        mock_stream_response(response_text),
         media_type="text/plain; charset=utf-8"
     )
 
@@ -0,0 +1,231 @@
+"""
+Write-behind conversation archiver
+Buffers messages per session and uploads them to S3/MinIO as gzip-compressed NDJSON segments
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# ----- Config -----
+ARCHIVE_QUEUE_SIZE = int(os.getenv("ARCHIVE_QUEUE_SIZE", "10000"))
+ARCHIVE_SEGMENT_MAX_MESSAGES = int(os.getenv("ARCHIVE_SEGMENT_MAX_MESSAGES", "200"))
+ARCHIVE_SEGMENT_MAX_BYTES = int(os.getenv("ARCHIVE_SEGMENT_MAX_BYTES", str(1024 * 1024)))
+ARCHIVE_SEGMENT_MAX_AGE = float(os.getenv("ARCHIVE_SEGMENT_MAX_AGE_SECONDS", "30"))
+ARCHIVE_UPLOAD_WORKERS = int(os.getenv("ARCHIVE_UPLOAD_WORKERS", "4"))
+ARCHIVE_UPLOAD_RETRIES = int(os.getenv("ARCHIVE_UPLOAD_RETRIES", "3"))
+
+# ----- Prometheus Metrics -----
+ARCHIVE_QUEUE_DEPTH = Gauge('archive_queue_depth', 'Messages waiting to be grouped into segments')
+ARCHIVE_BUFFERED = Gauge('archive_buffered_messages', 'Messages held in open segments')
+ARCHIVE_DROPPED = Counter('archive_dropped_messages_total', 'Messages that were never archived', ['reason'])
+ARCHIVE_SEGMENTS = Counter('archive_segments_total', 'Segment uploads', ['trigger', 'outcome'])
+ARCHIVE_SEGMENT_MESSAGES = Histogram(
+    'archive_segment_messages', 'Messages per uploaded segment',
+    buckets=(1, 2, 5, 10, 25, 50, 100, 200, 500, 1000)
+)
+ARCHIVE_FLUSH_TIME = Histogram('archive_flush_seconds', 'Compress + upload duration of one segment')
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Segment:
+    session_id: str
+    opened_at: float = field(default_factory=time.monotonic)
+    lines: List[bytes] = field(default_factory=list)
+    size: int = 0
+
+
+class ArchiveWriter:
+    """Non-blocking `submit()` in front of a single worker that batches and uploads.
+
+    Messages are grouped per session; a session's segment is flushed once it
+    reaches `max_messages` / `max_bytes` or has been open for `max_age`
+    seconds. Uploads run on a dedicated thread pool so boto3 never blocks
+    the event loop. At most `upload_workers` segments are uploading at once;
+    the worker waits for a free slot before it takes more messages, so a
+    slow store backs up the queue, where new messages are dropped and
+    counted rather than slowing down the chat path.
+    """
+
+    def __init__(self, s3_client, bucket: str, instance_id: str = "",
+                 prefix: str = "conversations",
+                 queue_size: int = ARCHIVE_QUEUE_SIZE,
+                 max_messages: int = ARCHIVE_SEGMENT_MAX_MESSAGES,
+                 max_bytes: int = ARCHIVE_SEGMENT_MAX_BYTES,
+                 max_age: float = ARCHIVE_SEGMENT_MAX_AGE,
+                 upload_workers: int = ARCHIVE_UPLOAD_WORKERS,
+                 retries: int = ARCHIVE_UPLOAD_RETRIES):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.instance_id = instance_id
+        self.prefix = prefix
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.retries = retries
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._segments: Dict[str, _Segment] = {}
+        self._buffered = 0
+        self._uploads = asyncio.Semaphore(upload_workers)
+        self._pending: set = set()
+        self._executor = ThreadPoolExecutor(max_workers=upload_workers, thread_name_prefix="archive")
+        self._worker: Optional[asyncio.Task] = None
+        self._closing = False
+
+    async def start(self):
+        """Start the grouping worker"""
+        if self._worker is None:
+            self._closing = False
+            self._worker = asyncio.create_task(self._run())
+            logger.info(
+                f"Archive writer started (messages={self.max_messages}, "
+                f"bytes={self.max_bytes}, age={self.max_age}s)"
+            )
+
+    async def close(self):
+        """Drain the queue, flush every open segment and wait for the uploads"""
+        self._closing = True
+        if self._worker is not None:
+            await self._queue.put(None)
+            await self._worker
+            self._worker = None
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+
+    def submit(self, session_id: str, payload: Dict) -> bool:
+        """Queue one message for archiving; never blocks"""
+        if self._closing or self._worker is None:
+            ARCHIVE_DROPPED.labels(reason="closed").inc()
+            return False
+        try:
+            self._queue.put_nowait((session_id, payload))
+        except asyncio.QueueFull:
+            ARCHIVE_DROPPED.labels(reason="queue_full").inc()
+            return False
+        ARCHIVE_QUEUE_DEPTH.set(self._queue.qsize())
+        return True
+
+    async def _run(self):
+        while True:
+            timeout = self._next_deadline()
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                item = False
+            ARCHIVE_QUEUE_DEPTH.set(self._queue.qsize())
+
+            if item is None:
+                # Shutdown sentinel: everything queued before it has been consumed
+                for session_id in list(self._segments):
+                    await self._flush(session_id, "shutdown")
+                return
+            if item:
+                await self._add(*item)
+            await self._flush_expired()
+
+    def _next_deadline(self) -> Optional[float]:
+        if not self._segments:
+            return None
+        oldest = min(segment.opened_at for segment in self._segments.values())
+        return max(0.0, oldest + self.max_age - time.monotonic())
+
+    async def _add(self, session_id: str, payload: Dict):
+        try:
+            line = json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n"
+        except (TypeError, ValueError) as e:
+            ARCHIVE_DROPPED.labels(reason="unserializable").inc()
+            logger.error(f"Archive message for {session_id} not serializable: {e}")
+            return
+        segment = self._segments.get(session_id)
+        if segment is None:
+            segment = self._segments[session_id] = _Segment(session_id)
+        segment.lines.append(line)
+        segment.size += len(line)
+        self._buffered += 1
+        ARCHIVE_BUFFERED.set(self._buffered)
+        if len(segment.lines) >= self.max_messages:
+            await self._flush(session_id, "count")
+        elif segment.size >= self.max_bytes:
+            await self._flush(session_id, "size")
+
+    async def _flush_expired(self):
+        now = time.monotonic()
+        for session_id, segment in list(self._segments.items()):
+            if now - segment.opened_at >= self.max_age:
+                await self._flush(session_id, "age")
+
+    async def _flush(self, session_id: str, trigger: str):
+        # Wait for a free slot here, so a slow store backs up the bounded queue, not memory
+        await self._uploads.acquire()
+        segment = self._segments.pop(session_id)
+        self._buffered -= len(segment.lines)
+        ARCHIVE_BUFFERED.set(self._buffered)
+        task = asyncio.create_task(self._upload(segment, trigger))
+        self._pending.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Task):
+        self._pending.discard(task)
+        self._uploads.release()
+
+    def _object_key(self, session_id: str) -> str:
+        suffix = f"{self.instance_id}-{uuid.uuid4().hex}" if self.instance_id else uuid.uuid4().hex
+        return f"{self.prefix}/{session_id}/{int(time.time() * 1000)}-{suffix}.ndjson.gz"
+
+    def _put(self, key: str, body: bytes, count: int, session_id: str):
+        self.s3_client.put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=body,
+            ContentType="application/x-ndjson",
+            ContentEncoding="gzip",
+            Metadata={
+                "session_id": session_id,
+                "instance_id": self.instance_id,
+                "message_count": str(count),
+            },
+        )
+
+    async def _upload(self, segment: _Segment, trigger: str):
+        count = len(segment.lines)
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        body = await loop.run_in_executor(self._executor, gzip.compress, b"".join(segment.lines))
+        key = self._object_key(segment.session_id)
+        for attempt in range(self.retries + 1):
+            try:
+                await loop.run_in_executor(
+                    self._executor, self._put, key, body, count, segment.session_id
+                )
+                break
+            except Exception as e:
+                if attempt == self.retries:
+                    ARCHIVE_SEGMENTS.labels(trigger=trigger, outcome="error").inc()
+                    ARCHIVE_DROPPED.labels(reason="upload_failed").inc(count)
+                    logger.error(f"Archive upload of {key} failed after {attempt + 1} attempts: {e}")
+                    return
+                await asyncio.sleep(min(2 ** attempt * 0.5, 5.0))
+        ARCHIVE_FLUSH_TIME.observe(time.perf_counter() - start)
+        ARCHIVE_SEGMENTS.labels(trigger=trigger, outcome="ok").inc()
+        ARCHIVE_SEGMENT_MESSAGES.observe(count)
+
+    def stats(self) -> Dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_size": self._queue.maxsize,
+            "open_segments": len(self._segments),
+            "buffered_messages": self._buffered,
+            "uploads_in_flight": len(self._pending),
+        }
@@ -0,0 +1,185 @@
+"""
+Bounded queue batch worker
+The queue-and-batch loop behind the write-behind writers: items are queued without blocking the caller,
+a single task drains them in batches on size or time, a full queue drops and counts, and close()
+flushes whatever is still queued; only the flush itself differs per store
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# ----- Prometheus Metrics -----
+BATCH_WORKER_ITEMS = Counter('batch_worker_items_total', 'Items by outcome', ['name', 'outcome'])
+BATCH_WORKER_QUEUE_DEPTH = Gauge('batch_worker_queue_depth', 'Items waiting to be flushed', ['name'])
+BATCH_WORKER_PUT_WAIT = Histogram(
+    'batch_worker_put_wait_seconds', 'Time producers waited for queue space', ['name'],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+logger = logging.getLogger(__name__)
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 10.0) -> float:
+    """Exponential backoff with full jitter for retry number `attempt` (0-based)"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class BatchWorker:
+    """Bounded queue drained in batches by one task.
+
+    A batch is handed to `_flush()` when `batch_size` items are queued or
+    `interval` seconds after the first one; `batch_size` is read for every
+    batch, so subclasses may resize it. Subclasses implement `_flush()` and
+    may point `items_metric`, `depth_metric` and `wait_metric` at their own
+    series (labelled by name first); refused items are counted there as
+    "closed" or "queue_full", and a batch whose `_flush()` raises as
+    "failed".
+    """
+
+    items_metric = BATCH_WORKER_ITEMS
+    depth_metric = BATCH_WORKER_QUEUE_DEPTH
+    wait_metric = BATCH_WORKER_PUT_WAIT
+
+    def __init__(self, name: str, batch_size: int, interval: float, queue_size: int,
+                 put_timeout: float = 0.0):
+        self.name = name
+        self.batch_size = max(1, batch_size)
+        self.interval = interval
+        self.put_timeout = put_timeout
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._worker: Optional[asyncio.Task] = None
+        self._closing = False
+        self._putting = 0  # producers waiting in put() for queue space
+
+    async def start(self):
+        if self._worker is None:
+            self._closing = False
+            self._worker = asyncio.create_task(self._run())
+            logger.info(f"{type(self).__name__} {self.name} started (batch={self.batch_size}, "
+                        f"interval={self.interval * 1000:g}ms)")
+
+    async def close(self):
+        """Flush everything already queued, then stop"""
+        self._closing = True
+        if self._worker is not None:
+            await self._queue.put(None)
+            await self._worker
+            self._worker = None
+            await self._flush_leftovers()
+
+    async def _flush_leftovers(self):
+        # A producer that was already waiting in put() can land behind the sentinel
+        while True:
+            leftovers = []
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is not None:
+                    leftovers.append(item)
+            self._update_depth()
+            for i in range(0, len(leftovers), self.batch_size):
+                await self._flush_batch(leftovers[i:i + self.batch_size])
+            if not leftovers:
+                if not self._putting:
+                    return
+                # Let woken producers finish their put
+                await asyncio.sleep(0)
+
+    def _count(self, outcome: str, amount: int = 1):
+        self.items_metric.labels(self.name, outcome).inc(amount)
+
+    def _update_depth(self):
+        self.depth_metric.labels(self.name).set(self._queue.qsize())
+
+    def _accepting(self) -> bool:
+        if self._closing or self._worker is None:
+            self._count("closed")
+            return False
+        return True
+
+    def add(self, item: Any) -> bool:
+        """Queue one item; never blocks, drops when the queue is full"""
+        if not self._accepting():
+            return False
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self._count("queue_full")
+            return False
+        self._update_depth()
+        return True
+
+    async def put(self, item: Any, timeout: Optional[float] = None) -> bool:
+        """Queue one item, waiting up to `timeout` seconds for queue space before dropping it"""
+        if not self._accepting():
+            return False
+        if self._queue.full():
+            start = time.perf_counter()
+            self._putting += 1
+            try:
+                await asyncio.wait_for(self._queue.put(item), self.put_timeout if timeout is None else timeout)
+            except asyncio.TimeoutError:
+                self._count("queue_full")
+                return False
+            finally:
+                self._putting -= 1
+                self.wait_metric.labels(self.name).observe(time.perf_counter() - start)
+        else:
+            self._queue.put_nowait(item)
+        self._update_depth()
+        return True
+
+    async def _next_batch(self) -> Tuple[List[Any], bool]:
+        """Up to `batch_size` items, waiting at most `interval` after the first"""
+        item = await self._queue.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _run(self):
+        while True:
+            batch, stop = await self._next_batch()
+            self._update_depth()
+            if batch:
+                await self._flush_batch(batch)
+            if stop:
+                return
+
+    async def _flush_batch(self, batch: List[Any]):
+        try:
+            await self._flush(batch)
+        except Exception as e:
+            self._count("failed", len(batch))
+            logger.error(f"{type(self).__name__} {self.name} dropped {len(batch)} items: {e}")
+
+    async def _flush(self, batch: List[Any]):
+        """Write one batch; an exception drops the batch and counts it as failed"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_size": self._queue.maxsize,
+            "batch_size": self.batch_size,
+            "interval_ms": self.interval * 1000,
+        }
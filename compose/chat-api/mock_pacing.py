@@ -0,0 +1,114 @@
+"""
+Mock response pacing
+Canned answers are split into pre-encoded byte chunks once and replayed at a configurable pace:
+no delay, a fixed token rate, or per-token jitter drawn from a distribution
+"""
+
+import asyncio
+import logging
+import math
+import os
+import random
+from functools import lru_cache
+from typing import AsyncGenerator, Iterable, Optional, Tuple
+
+# ----- Config -----
+MOCK_PACING_MODE = os.getenv("MOCK_PACING_MODE", "fixed")  # none | fixed | jitter
+MOCK_JITTER_DISTRIBUTION = os.getenv("MOCK_JITTER_DISTRIBUTION", "lognormal")
+MOCK_JITTER_SIGMA = float(os.getenv("MOCK_JITTER_SIGMA", "0.5"))  # spread relative to the mean gap
+MOCK_FIRST_TOKEN_MS = float(os.getenv("MOCK_FIRST_TOKEN_MS", "0"))  # simulated prompt processing
+MOCK_WORDS_PER_CHUNK = int(os.getenv("MOCK_WORDS_PER_CHUNK", "1"))
+MOCK_CHUNK_CACHE_SIZE = int(os.getenv("MOCK_CHUNK_CACHE_SIZE", "256"))
+
+PACING_MODES = ("none", "fixed", "jitter")
+JITTER_DISTRIBUTIONS = ("lognormal", "gamma", "exponential", "uniform")
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=MOCK_CHUNK_CACHE_SIZE)
+def encode_chunks(text: str, words_per_chunk: int = 1) -> Tuple[bytes, ...]:
+    """UTF-8 chunks of `words_per_chunk` space-separated words, separators kept"""
+    words = text.split(' ')
+    step = max(1, words_per_chunk)
+    return tuple(
+        ' '.join(words[i:i + step]).encode("utf-8") + (b' ' if i + step < len(words) else b'')
+        for i in range(0, len(words), step)
+    )
+
+
+@lru_cache(maxsize=MOCK_CHUNK_CACHE_SIZE)
+def encode_body(text: str) -> bytes:
+    return text.encode("utf-8")
+
+
+class Pacer:
+    """Replays text as a token stream at `tokens_per_second` (one word is one token)"""
+
+    def __init__(self, tokens_per_second: float, mode: str = MOCK_PACING_MODE,
+                 distribution: str = MOCK_JITTER_DISTRIBUTION, sigma: float = MOCK_JITTER_SIGMA,
+                 first_token_delay: float = MOCK_FIRST_TOKEN_MS / 1000,
+                 words_per_chunk: int = MOCK_WORDS_PER_CHUNK, seed: Optional[int] = None):
+        if mode not in PACING_MODES:
+            raise ValueError(f"Unknown pacing mode {mode!r}, expected one of {PACING_MODES}")
+        if distribution not in JITTER_DISTRIBUTIONS:
+            raise ValueError(f"Unknown jitter distribution {distribution!r}, expected one of {JITTER_DISTRIBUTIONS}")
+        self.mode = mode if tokens_per_second > 0 else "none"
+        self.tokens_per_second = tokens_per_second
+        self.distribution = distribution
+        self.sigma = max(sigma, 1e-6)
+        self.first_token_delay = first_token_delay
+        self.words_per_chunk = max(1, words_per_chunk)
+        self._rng = random.Random(seed)
+
+    def warm(self, texts: Iterable[str]):
+        """Pre-encode the canned answers so requests never split or encode them"""
+        count = 0
+        for text in texts:
+            encode_chunks(text, self.words_per_chunk)
+            encode_body(text)
+            count += 1
+        logger.info(f"Pre-encoded {count} mock responses ({self.describe()})")
+
+    def describe(self) -> str:
+        if self.mode == "none":
+            return "no pacing"
+        rate = f"{self.tokens_per_second:g} tokens/s"
+        return rate if self.mode == "fixed" else f"{rate}, {self.distribution} jitter sigma={self.sigma:g}"
+
+    def _gap(self, tokens: int) -> float:
+        """Seconds until the next chunk, for a chunk of `tokens` tokens"""
+        mean = tokens / self.tokens_per_second
+        if self.mode == "fixed":
+            return mean
+        if self.distribution == "lognormal":
+            return self._rng.lognormvariate(math.log(mean) - self.sigma ** 2 / 2, self.sigma)
+        if self.distribution == "gamma":
+            shape = 1 / self.sigma ** 2
+            return self._rng.gammavariate(shape, mean / shape)
+        if self.distribution == "exponential":
+            return self._rng.expovariate(1 / mean)
+        return self._rng.uniform(mean * max(0.0, 1 - self.sigma), mean * (1 + self.sigma))
+
+    async def stream(self, text: str) -> AsyncGenerator[bytes, None]:
+        """The pre-encoded chunks of `text`, paced per the configured mode.
+
+        Sleeps target an absolute schedule, so the rate holds under load
+        instead of drifting by each wake-up's lateness.
+        """
+        if self.mode == "none":
+            if self.first_token_delay:
+                await asyncio.sleep(self.first_token_delay)
+            yield encode_body(text)
+            return
+
+        loop = asyncio.get_running_loop()
+        chunks = encode_chunks(text, self.words_per_chunk)
+        due = loop.time() + self.first_token_delay
+        for i, chunk in enumerate(chunks):
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield chunk
+            if i + 1 < len(chunks):
+                due += self._gap(self.words_per_chunk)
@@ -0,0 +1,129 @@
+"""
+Process-wide model registry
+Each model is loaded once and shared by every request: required models at startup, optional ones on
+first use; load time and memory are recorded per model for the /models endpoint
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from prometheus_client import Gauge
+
+# ----- Prometheus Metrics -----
+MODEL_LOAD_SECONDS = Gauge('model_load_seconds', 'Time taken to load each model', ['model'])
+MODEL_MEMORY = Gauge('model_memory_bytes', 'Process RSS growth while loading each model', ['model'])
+MODEL_LOADED = Gauge('model_loaded', '1 once a model is loaded', ['model'])
+
+logger = logging.getLogger(__name__)
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Resident set size of this process (Linux), or None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def parameter_bytes(model: Any) -> Optional[int]:
+    """Size of a torch module's parameters and buffers, or None for other objects"""
+    if not hasattr(model, "parameters"):
+        return None
+    try:
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    except Exception:
+        return None
+
+
+@dataclass
+class _Entry:
+    loader: Callable[[], Any]
+    required: bool
+    description: str
+    model: Any = None
+    status: str = "registered"  # registered | loading | loaded | failed
+    error: Optional[str] = None
+    load_seconds: Optional[float] = None
+    rss_delta_bytes: Optional[int] = None
+    parameter_bytes: Optional[int] = None
+    loaded_at: Optional[float] = None
+    uses: int = 0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class ModelRegistry:
+    """Named models with a blocking `loader()` each, run once on a worker thread"""
+
+    def __init__(self):
+        self._entries: Dict[str, _Entry] = {}
+
+    def register(self, name: str, loader: Callable[[], Any], required: bool = True, description: str = ""):
+        """Add a model; `required` ones are loaded by load_required(), the rest on first get()"""
+        self._entries[name] = _Entry(loader, required, description)
+
+    async def _load(self, name: str, entry: _Entry):
+        entry.status = "loading"
+        rss_before = process_rss_bytes()
+        start = time.perf_counter()
+        try:
+            model = await asyncio.to_thread(entry.loader)
+        except Exception as e:
+            entry.status, entry.error = "failed", str(e)
+            logger.error(f"Failed to load model {name}: {e}")
+            raise
+        entry.load_seconds = time.perf_counter() - start
+        rss_after = process_rss_bytes()
+        if rss_before is not None and rss_after is not None:
+            # Approximate: other allocations made while loading are counted too
+            entry.rss_delta_bytes = max(rss_after - rss_before, 0)
+            MODEL_MEMORY.labels(model=name).set(entry.rss_delta_bytes)
+        entry.parameter_bytes = parameter_bytes(model)
+        entry.model, entry.status, entry.error, entry.loaded_at = model, "loaded", None, time.time()
+        MODEL_LOAD_SECONDS.labels(model=name).set(entry.load_seconds)
+        MODEL_LOADED.labels(model=name).set(1)
+        logger.info(f"Model {name} loaded in {entry.load_seconds:.2f}s")
+
+    async def get(self, name: str) -> Any:
+        """The loaded model, loading it now if this is its first use"""
+        entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"Unknown model {name!r}")
+        if entry.model is None:
+            async with entry.lock:
+                if entry.model is None:
+                    await self._load(name, entry)
+        entry.uses += 1
+        return entry.model
+
+    def loaded(self, name: str) -> Optional[Any]:
+        """The model if it is already loaded, without triggering a load"""
+        entry = self._entries.get(name)
+        return entry.model if entry is not None else None
+
+    async def load_required(self):
+        """Load every required model, one after another so memory deltas stay attributable"""
+        for name, entry in self._entries.items():
+            if entry.required:
+                await self.get(name)
+
+    def stats(self) -> Dict:
+        return {
+            name: {
+                "description": entry.description,
+                "required": entry.required,
+                "status": entry.status,
+                "error": entry.error,
+                "load_seconds": round(entry.load_seconds, 3) if entry.load_seconds is not None else None,
+                "rss_delta_bytes": entry.rss_delta_bytes,
+                "parameter_bytes": entry.parameter_bytes,
+                "loaded_at": entry.loaded_at,
+                "uses": entry.uses,
+            }
+            for name, entry in self._entries.items()
+        }
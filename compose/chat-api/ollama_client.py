@@ -0,0 +1,206 @@
+"""
+Shared Ollama HTTP client
+One pooled httpx.AsyncClient per process with keep-alive and per-phase timeouts
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import AsyncGenerator, Dict, Optional
+
+import httpx
+from prometheus_client import Counter, Gauge, Histogram
+
+# ----- Config -----
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "100"))
+OLLAMA_MAX_KEEPALIVE = int(os.getenv("OLLAMA_MAX_KEEPALIVE", "20"))
+OLLAMA_KEEPALIVE_EXPIRY = float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY_SECONDS", "60"))
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT_SECONDS", "5"))
+OLLAMA_POOL_TIMEOUT = float(os.getenv("OLLAMA_POOL_TIMEOUT_SECONDS", "10"))
+OLLAMA_FIRST_BYTE_TIMEOUT = float(os.getenv("OLLAMA_FIRST_BYTE_TIMEOUT_SECONDS", "120"))
+OLLAMA_IDLE_TIMEOUT = float(os.getenv("OLLAMA_IDLE_TIMEOUT_SECONDS", "30"))
+
+# ----- Prometheus Metrics -----
+OLLAMA_REQUESTS = Counter('ollama_client_requests_total', 'Requests sent to Ollama', ['kind', 'outcome'])
+OLLAMA_INFLIGHT = Gauge('ollama_client_inflight_requests', 'Requests currently holding a pooled connection')
+OLLAMA_POOL_SIZE = Gauge('ollama_client_pool_max_connections', 'Configured Ollama connection pool size')
+OLLAMA_POOL_UTILIZATION = Gauge('ollama_client_pool_utilization_ratio', 'In-flight requests / pool size')
+OLLAMA_FIRST_BYTE = Histogram('ollama_client_first_byte_seconds', 'Time until the first Ollama chunk', ['kind'])
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaError(Exception):
+    """Ollama answered with a non-200 status or reported an error inside a stream"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(f"ollama error {status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+class OllamaClient:
+    """App-lifetime Ollama client. Call start() on startup and close() on shutdown."""
+
+    def __init__(self, base_url: str,
+                 max_connections: int = OLLAMA_MAX_CONNECTIONS,
+                 max_keepalive: int = OLLAMA_MAX_KEEPALIVE,
+                 keepalive_expiry: float = OLLAMA_KEEPALIVE_EXPIRY,
+                 connect_timeout: float = OLLAMA_CONNECT_TIMEOUT,
+                 first_byte_timeout: float = OLLAMA_FIRST_BYTE_TIMEOUT,
+                 idle_timeout: float = OLLAMA_IDLE_TIMEOUT,
+                 pool_timeout: float = OLLAMA_POOL_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.first_byte_timeout = first_byte_timeout
+        self.idle_timeout = idle_timeout
+        self.pool_timeout = pool_timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self._inflight = 0
+
+    async def start(self):
+        """Open the pooled client"""
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            # httpx applies `read` to every socket read; the first-byte and
+            # idle-between-tokens phases are enforced separately below.
+            timeout=httpx.Timeout(
+                connect=self.connect_timeout,
+                read=max(self.first_byte_timeout, self.idle_timeout),
+                write=self.connect_timeout,
+                pool=self.pool_timeout,
+            ),
+        )
+        OLLAMA_POOL_SIZE.set(self.max_connections)
+        logger.info(f"Ollama client started ({self.base_url}, pool={self.max_connections})")
+
+    async def close(self):
+        """Close the pooled client and drop keep-alive connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("Ollama client closed")
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    def _acquire(self):
+        self._inflight += 1
+        OLLAMA_INFLIGHT.set(self._inflight)
+        OLLAMA_POOL_UTILIZATION.set(self._inflight / max(self.max_connections, 1))
+
+    def _release(self):
+        self._inflight -= 1
+        OLLAMA_INFLIGHT.set(self._inflight)
+        OLLAMA_POOL_UTILIZATION.set(self._inflight / max(self.max_connections, 1))
+
+    def _require_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("OllamaClient.start() was not called")
+        return self._client
+
+    async def post(self, path: str, payload: Dict) -> httpx.Response:
+        """Non-streaming POST; the whole generation happens before the first byte"""
+        client = self._require_client()
+        timeout = httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.first_byte_timeout,
+            write=self.connect_timeout,
+            pool=self.pool_timeout,
+        )
+        self._acquire()
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            response = await client.post(path, json=payload, timeout=timeout)
+            OLLAMA_FIRST_BYTE.labels(kind="post").observe(time.perf_counter() - start)
+            outcome = "ok" if response.status_code == 200 else f"http_{response.status_code}"
+            return response
+        except httpx.TimeoutException:
+            outcome = "timeout"
+            raise
+        finally:
+            self._release()
+            OLLAMA_REQUESTS.labels(kind="post", outcome=outcome).inc()
+
+    async def stream(self, path: str, payload: Dict) -> AsyncGenerator[Dict, None]:
+        """Streaming POST yielding each NDJSON object Ollama sends.
+
+        Raises OllamaError on a non-200 status, on an in-band `{"error": ...}`
+        object and when the body ends before the `done` object, and
+        httpx.ReadTimeout when the first chunk or the gap between two chunks
+        exceeds its budget.
+        """
+        client = self._require_client()
+        self._acquire()
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            async with client.stream("POST", path, json=payload) as resp:
+                if resp.status_code != 200:
+                    text = await resp.aread()
+                    outcome = f"http_{resp.status_code}"
+                    raise OllamaError(resp.status_code, text.decode("utf-8", "ignore"))
+
+                lines = resp.aiter_lines()
+                budget = self.first_byte_timeout
+                first = True
+                done = False
+                while True:
+                    try:
+                        line = await asyncio.wait_for(lines.__anext__(), timeout=budget)
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        phase = "first byte" if first else "next token"
+                        raise httpx.ReadTimeout(f"Ollama {phase} timeout after {budget}s")
+                    if first:
+                        OLLAMA_FIRST_BYTE.labels(kind="stream").observe(time.perf_counter() - start)
+                        first = False
+                        budget = self.idle_timeout
+                    if not line:
+                        continue
+                    try:
+                        obj = json.loads(line)
+                    except ValueError:
+                        continue
+                    if obj.get("error"):
+                        raise OllamaError(resp.status_code, str(obj["error"]))
+                    yield obj
+                    if obj.get("done"):
+                        done = True
+                        break
+                if not done:
+                    raise OllamaError(resp.status_code, "stream ended before done")
+            outcome = "ok"
+        except httpx.TimeoutException:
+            outcome = "timeout"
+            raise
+        except (GeneratorExit, asyncio.CancelledError):
+            outcome = "cancelled"
+            raise
+        finally:
+            self._release()
+            OLLAMA_REQUESTS.labels(kind="stream", outcome=outcome).inc()
+
+    def stats(self) -> Dict:
+        return {
+            "base_url": self.base_url,
+            "inflight": self._inflight,
+            "max_connections": self.max_connections,
+            "max_keepalive": self.max_keepalive,
+            "utilization": self._inflight / max(self.max_connections, 1),
+        }
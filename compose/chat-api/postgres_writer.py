@@ -0,0 +1,108 @@
+"""
+Buffered PostgreSQL writes with COPY
+Rows are queued and written with one binary `COPY ... FROM STDIN` (asyncpg copy_records_to_table)
+per batch instead of one INSERT and pool round trip per row; a full buffer makes producers wait briefly,
+then drops and counts, and close() flushes whatever is still queued
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import asyncpg
+from prometheus_client import Counter, Gauge, Histogram
+
+from batch_worker import BatchWorker, backoff_delay
+
+# ----- Config -----
+POSTGRES_COPY_BATCH_SIZE = int(os.getenv("POSTGRES_COPY_BATCH_SIZE", "500"))
+POSTGRES_COPY_INTERVAL = float(os.getenv("POSTGRES_COPY_INTERVAL_MS", "200")) / 1000
+POSTGRES_COPY_QUEUE_SIZE = int(os.getenv("POSTGRES_COPY_QUEUE_SIZE", "10000"))
+POSTGRES_COPY_PUT_TIMEOUT = float(os.getenv("POSTGRES_COPY_PUT_TIMEOUT_MS", "1000")) / 1000
+POSTGRES_COPY_MAX_RETRIES = int(os.getenv("POSTGRES_COPY_MAX_RETRIES", "3"))
+
+# ----- Prometheus Metrics -----
+POSTGRES_COPY_ROWS = Counter('postgres_copy_rows_total', 'Rows by write outcome', ['name', 'outcome'])
+POSTGRES_COPY_TIME = Histogram(
+    'postgres_copy_seconds', 'Duration of one COPY batch', ['name'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+POSTGRES_COPY_BATCH_ROWS = Histogram(
+    'postgres_copy_batch_rows', 'Rows per COPY batch', ['name'],
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+)
+POSTGRES_COPY_QUEUE_DEPTH = Gauge('postgres_copy_queue_depth', 'Rows waiting to be written', ['name'])
+POSTGRES_COPY_WAIT = Histogram(
+    'postgres_copy_put_wait_seconds', 'Time producers waited for buffer space', ['name'],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+# Bad data fails the whole COPY; these are isolated row by row instead of retried
+DATA_ERRORS = (asyncpg.DataError, asyncpg.IntegrityConstraintViolationError)
+
+logger = logging.getLogger(__name__)
+
+
+async def copy_rows(pool, table: str, columns: Sequence[str], rows: List[Tuple], name: str = "default"):
+    """Write `rows` (tuples in `columns` order) with one COPY on a pooled connection"""
+    start = time.perf_counter()
+    async with pool.acquire() as conn:
+        await conn.copy_records_to_table(table, records=rows, columns=columns)
+    POSTGRES_COPY_TIME.labels(name=name).observe(time.perf_counter() - start)
+    POSTGRES_COPY_BATCH_ROWS.labels(name=name).observe(len(rows))
+    POSTGRES_COPY_ROWS.labels(name=name, outcome="written").inc(len(rows))
+
+
+class PostgresCopyWriter(BatchWorker):
+    """Write buffer for one table.
+
+    A batch is copied when `batch_size` rows are queued or `interval` seconds
+    after the first one. Connection errors are retried with backoff; a batch
+    rejected for its data is retried row by row so one bad row only loses
+    itself.
+    """
+
+    items_metric = POSTGRES_COPY_ROWS
+    depth_metric = POSTGRES_COPY_QUEUE_DEPTH
+    wait_metric = POSTGRES_COPY_WAIT
+
+    def __init__(self, pool, table: str, columns: Sequence[str], name: Optional[str] = None,
+                 batch_size: int = POSTGRES_COPY_BATCH_SIZE,
+                 interval: float = POSTGRES_COPY_INTERVAL,
+                 queue_size: int = POSTGRES_COPY_QUEUE_SIZE,
+                 put_timeout: float = POSTGRES_COPY_PUT_TIMEOUT,
+                 max_retries: int = POSTGRES_COPY_MAX_RETRIES):
+        super().__init__(name or table, batch_size, interval, queue_size, put_timeout)
+        self.pool = pool
+        self.table = table
+        self.columns = list(columns)
+        self.max_retries = max_retries
+
+    async def _flush(self, batch: List[Tuple]):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await copy_rows(self.pool, self.table, self.columns, batch, self.name)
+                return
+            except DATA_ERRORS as e:
+                logger.warning(f"Postgres writer {self.name}: batch rejected ({e}), copying row by row")
+                await self._flush_rows(batch)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self._count("failed", len(batch))
+                    logger.error(f"Postgres writer {self.name} dropped {len(batch)} rows "
+                                 f"after {attempt + 1} attempts: {e}")
+                    return
+                delay = backoff_delay(attempt)
+                logger.warning(f"Postgres COPY failed ({e}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def _flush_rows(self, batch: List[Tuple]):
+        for row in batch:
+            try:
+                await copy_rows(self.pool, self.table, self.columns, [row], self.name)
+            except Exception as e:
+                self._count("rejected")
+                logger.error(f"Postgres writer {self.name} rejected a row: {e}")
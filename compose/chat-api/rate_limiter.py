@@ -0,0 +1,237 @@
+"""
+Distributed rate limiter
+Atomic sliding-window check in a Redis Lua script, fronted by small per-process token leases
+"""
+
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Tuple
+
+from fastapi import HTTPException, Request
+from prometheus_client import Counter, Histogram
+
+# ----- Config -----
+RATE_LIMIT_LOCAL_FRACTION = float(os.getenv("RATE_LIMIT_LOCAL_FRACTION", "0"))  # 0 disables leases
+RATE_LIMIT_LEASE_SECONDS = float(os.getenv("RATE_LIMIT_LEASE_SECONDS", "1.0"))
+RATE_LIMIT_MAX_LOCAL_KEYS = int(os.getenv("RATE_LIMIT_MAX_LOCAL_KEYS", "10000"))
+RATE_LIMIT_FAIL_OPEN = os.getenv("RATE_LIMIT_FAIL_OPEN", "true").lower() == "true"
+
+# ----- Prometheus Metrics -----
+RATE_LIMIT_DECISIONS = Counter(
+    'rate_limit_decisions_total', 'Rate limit decisions', ['limiter', 'decision', 'source']
+)
+RATE_LIMIT_CHECK_TIME = Histogram(
+    'rate_limit_check_seconds', 'Time to reach a rate limit decision', ['source'],
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+)
+
+logger = logging.getLogger(__name__)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Sliding-window counter: the previous fixed window's count is weighted by how
+# much of it still overlaps the sliding window. First gives back ARGV[5]
+# unused lease tokens charged in the window starting at ARGV[6], then grants
+# up to ARGV[3] tokens (at least ARGV[4]) and returns
+# {granted, remaining, retry_after_ms, window_start_ms}.
+# Uses the Redis server clock so every worker agrees on the window.
+SLIDING_WINDOW_LUA = """
+if redis.replicate_commands then redis.replicate_commands() end
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local want = tonumber(ARGV[3])
+local need = tonumber(ARGV[4])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local start = now - (now % window)
+
+local state = redis.call('HMGET', KEYS[1], 'w', 'c', 'p')
+local w = tonumber(state[1])
+local cur = tonumber(state[2]) or 0
+local prev = tonumber(state[3]) or 0
+if w ~= start then
+  if w == start - window then prev = cur else prev = 0 end
+  cur = 0
+end
+
+local refund = tonumber(ARGV[5]) or 0
+if refund > 0 then
+  local from = tonumber(ARGV[6])
+  if from == start then
+    cur = math.max(0, cur - refund)
+  elseif from == start - window then
+    prev = math.max(0, prev - refund)
+  end
+end
+
+local weighted = prev * (window - (now - start)) / window
+local available = math.floor(limit - weighted - cur)
+local granted = math.min(want, available)
+local retry = 0
+if granted < need then
+  granted = 0
+  if cur + need > limit then
+    retry = start + window - now
+  else
+    local elapsed = window * (1 - (limit - cur - need) / prev)
+    retry = math.max(1, math.ceil(start + elapsed - now))
+  end
+else
+  cur = cur + granted
+end
+
+redis.call('HSET', KEYS[1], 'w', start, 'c', cur, 'p', prev)
+redis.call('PEXPIRE', KEYS[1], window * 2)
+return {granted, math.max(0, available - granted), retry, start}
+"""
+
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """'60/minute' -> (60, 60); same notation slowapi uses"""
+    count, _, period = rate.partition("/")
+    period = period.strip().lower().rstrip("s")
+    if period not in _PERIODS:
+        raise ValueError(f"Unsupported rate period in {rate!r}")
+    return int(count), _PERIODS[period]
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    remaining: int
+    retry_after: float = 0.0  # seconds
+
+
+@dataclass
+class _Lease:
+    tokens: int
+    expires_at: float
+    denied_until: float = 0.0
+    window_start: int = 0  # Redis window the tokens were charged to, ms
+    checked_at: float = 0.0  # last Redis round trip for this key
+
+
+class RateLimiter:
+    """One Redis round trip per decision, or none while a local lease lasts.
+
+    When a key that went to Redis less than `lease_seconds` ago misses
+    again, the limiter asks for a lease of roughly `local_fraction * limit`
+    tokens instead of one and spends it in-process for up to
+    `lease_seconds`; keys without sustained local traffic pay one token per
+    request. Leased tokens are already counted in Redis, so the global
+    limit holds across workers, and whatever is left of a lease is given
+    back on the key's next round trip. Denials are cached locally until
+    their retry-after.
+    """
+
+    def __init__(self, redis_client=None, name: str = "default",
+                 local_fraction: float = RATE_LIMIT_LOCAL_FRACTION,
+                 lease_seconds: float = RATE_LIMIT_LEASE_SECONDS,
+                 max_local_keys: int = RATE_LIMIT_MAX_LOCAL_KEYS,
+                 fail_open: bool = RATE_LIMIT_FAIL_OPEN):
+        self.name = name
+        self.local_fraction = local_fraction
+        self.lease_seconds = lease_seconds
+        self.max_local_keys = max_local_keys
+        self.fail_open = fail_open
+        self._leases: "OrderedDict[str, _Lease]" = OrderedDict()
+        self._script = None
+        self.redis_client = redis_client
+
+    @property
+    def redis_client(self):
+        return self._redis_client
+
+    @redis_client.setter
+    def redis_client(self, client):
+        self._redis_client = client
+        self._script = client.register_script(SLIDING_WINDOW_LUA) if client is not None else None
+
+    def _record(self, decision: str, source: str, started: float):
+        RATE_LIMIT_DECISIONS.labels(limiter=self.name, decision=decision, source=source).inc()
+        RATE_LIMIT_CHECK_TIME.labels(source=source).observe(time.perf_counter() - started)
+
+    def _lease_size(self, lease, limit: int, cost: int, now: float) -> int:
+        if self.local_fraction <= 0 or lease is None or now - lease.checked_at >= self.lease_seconds:
+            return cost
+        return max(cost, int(limit * self.local_fraction))
+
+    async def hit(self, key: str, limit: int, window: int, cost: int = 1) -> RateLimitResult:
+        """Consume `cost` units of `limit` per `window` seconds for `key`"""
+        started = time.perf_counter()
+        bucket = f"rl:{self.name}:{limit}/{window}:{key}"
+        now = time.monotonic()
+
+        lease = self._leases.get(bucket)
+        if lease is not None:
+            if lease.denied_until > now:
+                self._record("denied", "local", started)
+                return RateLimitResult(False, 0, lease.denied_until - now)
+            if lease.expires_at > now and lease.tokens >= cost:
+                lease.tokens -= cost
+                self._record("allowed", "local", started)
+                return RateLimitResult(True, lease.tokens)
+
+        if self._script is None:
+            self._record("allowed" if self.fail_open else "denied", "unavailable", started)
+            return RateLimitResult(self.fail_open, 0)
+
+        want = self._lease_size(lease, limit, cost, now)
+        refund, refund_window = 0, 0
+        if lease is not None:
+            # Given back at most once, even if the call below fails
+            refund, refund_window, lease.tokens = lease.tokens, lease.window_start, 0
+        try:
+            granted, remaining, retry_ms, window_start = await self._script(
+                keys=[bucket], args=[limit, window * 1000, want, cost, refund, refund_window]
+            )
+        except Exception as e:
+            logger.warning(f"Rate limiter Redis check failed: {e}")
+            self._record("allowed" if self.fail_open else "denied", "error", started)
+            return RateLimitResult(self.fail_open, 0)
+
+        granted, remaining, window_start = int(granted), int(remaining), int(window_start)
+        if granted >= cost:
+            leftover = granted - cost
+            if self.local_fraction > 0:
+                self._store(bucket, _Lease(leftover, now + self.lease_seconds,
+                                           window_start=window_start, checked_at=now))
+            self._record("allowed", "redis", started)
+            return RateLimitResult(True, remaining + leftover)
+
+        retry_after = int(retry_ms) / 1000.0
+        if self.local_fraction > 0:
+            self._store(bucket, _Lease(0, now, denied_until=now + retry_after,
+                                       window_start=window_start, checked_at=now))
+        self._record("denied", "redis", started)
+        return RateLimitResult(False, 0, retry_after)
+
+    def _store(self, bucket: str, lease: _Lease):
+        self._leases[bucket] = lease
+        self._leases.move_to_end(bucket)
+        while len(self._leases) > self.max_local_keys:
+            self._leases.popitem(last=False)
+
+    async def check(self, key: str, limit: int, window: int, cost: int = 1) -> RateLimitResult:
+        """hit() that raises a 429 with Retry-After when the limit is exceeded"""
+        result = await self.hit(key, limit, window, cost)
+        if not result.allowed:
+            raise HTTPException(
+                status_code=429,
+                detail="Rate limit exceeded",
+                headers={"Retry-After": str(max(1, math.ceil(result.retry_after)))}
+            )
+        return result
+
+    def limit(self, rate: str, key_func: Callable[[Request], str]):
+        """FastAPI dependency enforcing a slowapi-style rate string, e.g. Depends(limiter.limit("60/minute", get_remote_address))"""
+        count, window = parse_rate(rate)
+
+        async def dependency(request: Request) -> RateLimitResult:
+            return await self.check(key_func(request), count, window)
+
+        return dependency
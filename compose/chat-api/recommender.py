@@ -0,0 +1,289 @@
+"""
+Co-occurrence recommendation engine
+Question history is read from the graph incrementally into sparse user x question counts; recommendations
+combine the user's category affinity with questions asked by users who asked the same things, served from memory
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from prometheus_client import Counter, Gauge, Histogram
+from scipy import sparse
+
+# ----- Config -----
+RECOMMENDER_REFRESH_SECONDS = float(os.getenv("RECOMMENDER_REFRESH_SECONDS", "300"))
+RECOMMENDER_PAGE_SIZE = int(os.getenv("RECOMMENDER_PAGE_SIZE", "50000"))  # rows per graph read
+# Re-read window behind the watermark: longer than a row can take to reach the graph (batching, retries, clock skew)
+RECOMMENDER_OVERLAP_SECONDS = int(os.getenv("RECOMMENDER_OVERLAP_SECONDS", "120"))
+RECOMMENDER_COOCCURRENCE_WEIGHT = float(os.getenv("RECOMMENDER_COOCCURRENCE_WEIGHT", "1.0"))
+RECOMMENDER_NEIGHBOURS = int(os.getenv("RECOMMENDER_NEIGHBOURS", "50"))  # co-asked questions kept per question
+RECOMMENDER_TOP_N = int(os.getenv("RECOMMENDER_TOP_N", "20"))  # cached per user
+RECOMMENDER_CACHE_SIZE = int(os.getenv("RECOMMENDER_CACHE_SIZE", "50000"))  # users
+
+# ----- Prometheus Metrics -----
+RECOMMENDER_REFRESHES = Counter('recommender_refreshes_total', 'Model refreshes by kind and outcome', ['kind', 'outcome'])
+RECOMMENDER_REFRESH_TIME = Histogram(
+    'recommender_refresh_seconds', 'Graph read plus matrix build', ['kind'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+)
+RECOMMENDER_LAST_REFRESH = Gauge('recommender_last_refresh_timestamp', 'Unix time of the last successful refresh')
+RECOMMENDER_STALENESS = Gauge('recommender_staleness_seconds', 'Seconds since the last successful refresh')
+RECOMMENDER_SIZE = Gauge('recommender_model_size', 'Model dimensions', ['dimension'])
+RECOMMENDER_LATENCY = Histogram(
+    'recommender_request_seconds', 'Time to serve one recommendation request', ['cache'],
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05)
+)
+
+# Questions with their answer and category, newest last. Incremental reads start `overlap` seconds
+# before the `since` watermark, because timestamps are set when a row is queued and rows from
+# several replicas land late and out of order; (`after`, `after_id`) is the paging cursor.
+HISTORY_QUERY = """
+    MATCH (u:User)-[:ASKED]->(q:Question)-[:HAS_ANSWER]->(a:Answer)
+    WHERE q.timestamp IS NOT NULL
+      AND ($since IS NULL OR q.timestamp > datetime($since) - duration({seconds: $overlap}))
+      AND ($after IS NULL OR q.timestamp > datetime($after)
+           OR (q.timestamp = datetime($after) AND elementId(q) > $after_id))
+    RETURN elementId(q) AS id, u.id AS user_id, q.text AS question, q.category AS category,
+           a.text AS answer, toString(q.timestamp) AS ts
+    ORDER BY q.timestamp, id
+    LIMIT $limit
+"""
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Model:
+    """Immutable snapshot served to requests; replaced whole on every refresh"""
+    users: Dict[str, int] = field(default_factory=dict)
+    questions: List[Dict] = field(default_factory=list)
+    asked: sparse.csr_matrix = None  # users x questions, ask counts
+    cooccurrence: sparse.csr_matrix = None  # questions x questions, pruned to the strongest neighbours
+    affinity: sparse.csr_matrix = None  # users x categories, ask counts
+    by_category: sparse.csr_matrix = None  # categories x questions, question popularity
+    built_at: float = 0.0
+    cache: OrderedDict = field(default_factory=OrderedDict)
+
+
+class RecommendationEngine:
+    """Sparse co-occurrence recommender over the conversation graph.
+
+    Each refresh reads the questions newer than the previous one, minus an
+    `overlap` window for rows that reached the graph late, and appends the
+    ones not seen before to the accumulated history; `refresh(full=True)`
+    starts over, which also drops deleted nodes.
+    """
+
+    def __init__(self, driver, refresh_interval: float = RECOMMENDER_REFRESH_SECONDS,
+                 cooccurrence_weight: float = RECOMMENDER_COOCCURRENCE_WEIGHT,
+                 neighbours: int = RECOMMENDER_NEIGHBOURS, top_n: int = RECOMMENDER_TOP_N,
+                 page_size: int = RECOMMENDER_PAGE_SIZE,
+                 overlap: int = RECOMMENDER_OVERLAP_SECONDS):
+        self.driver = driver
+        self.refresh_interval = refresh_interval
+        self.cooccurrence_weight = cooccurrence_weight
+        self.neighbours = neighbours
+        self.top_n = top_n
+        self.page_size = page_size
+        self.overlap = overlap
+        self._model = _Model()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._reset()
+        RECOMMENDER_STALENESS.set_function(self.staleness)
+
+    def _reset(self):
+        self._user_ids: Dict[str, int] = {}
+        self._question_ids: Dict[str, int] = {}
+        self._category_ids: Dict[str, int] = {}
+        self._question_info: List[Dict] = []
+        self._question_category: List[int] = []
+        self._event_user: List[int] = []
+        self._event_question: List[int] = []
+        self._since: Optional[str] = None
+        self._recent: Set[str] = set()  # question node ids read by the last fetch, i.e. the overlap window
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Recommendation refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def staleness(self) -> float:
+        return time.time() - self._model.built_at if self._model.built_at else float("inf")
+
+    def _add(self, row: Dict):
+        text = row["question"]
+        if not text:
+            return
+        category = self._category_ids.setdefault(row.get("category") or "general", len(self._category_ids))
+        info = {"question": text, "answer": row["answer"], "category": row.get("category")}
+        q = self._question_ids.get(text)
+        if q is None:
+            q = self._question_ids[text] = len(self._question_info)
+            self._question_info.append(info)
+            self._question_category.append(category)
+        else:
+            # Latest answer and category win
+            self._question_info[q] = info
+            self._question_category[q] = category
+        self._event_user.append(self._user_ids.setdefault(row["user_id"], len(self._user_ids)))
+        self._event_question.append(q)
+
+    async def _fetch(self) -> int:
+        """Append every question not read yet, from `overlap` before the watermark on; returns how many"""
+        fetched, after, after_id = 0, None, ""
+        seen: Set[str] = set()
+        while True:
+            async with self.driver.session() as session:
+                result = await session.run(HISTORY_QUERY, since=self._since, overlap=self.overlap,
+                                           after=after, after_id=after_id, limit=self.page_size)
+                rows = await result.data()
+            for row in rows:
+                seen.add(row["id"])
+                if row["id"] not in self._recent:
+                    self._add(row)
+                    fetched += 1
+            # A failed page leaves the watermark behind; remember what was added meanwhile
+            self._recent.update(seen)
+            if rows:
+                after, after_id = rows[-1]["ts"], rows[-1]["id"]
+            if len(rows) < self.page_size:
+                break
+        # Anything older than this fetch's window is never read again
+        self._recent = seen
+        if after is not None:
+            self._since = after
+        return fetched
+
+    def _cooccurrence(self, asked: sparse.csr_matrix) -> sparse.csr_matrix:
+        """Question x question co-ask counts, keeping each question's strongest neighbours"""
+        binary = (asked > 0).astype(np.float32)
+        co = (binary.T @ binary).tocsr()
+        co.setdiag(0)
+        co.eliminate_zeros()
+        k = self.neighbours
+        indptr, indices, data = co.indptr, co.indices, co.data
+        keep = np.ones(len(data), dtype=bool)
+        for q in np.flatnonzero(np.diff(indptr) > k):
+            lo, hi = indptr[q], indptr[q + 1]
+            keep[lo + np.argpartition(-data[lo:hi], k)[k:]] = False
+        rows = np.repeat(np.arange(co.shape[0]), np.diff(indptr))
+        return sparse.csr_matrix((data[keep], (rows[keep], indices[keep])), shape=co.shape)
+
+    def _build(self) -> _Model:
+        n_users, n_questions = len(self._user_ids), len(self._question_info)
+        n_categories = max(len(self._category_ids), 1)
+        events = np.asarray(self._event_user, dtype=np.int32), np.asarray(self._event_question, dtype=np.int32)
+        asked = sparse.csr_matrix((np.ones(len(events[0]), dtype=np.float32), events),
+                                  shape=(n_users, n_questions))  # duplicates are summed
+        membership = sparse.csr_matrix(
+            (np.ones(n_questions, dtype=np.float32), (np.asarray(self._question_category, dtype=np.int32),
+                                                      np.arange(n_questions))),
+            shape=(n_categories, n_questions)
+        )
+        popularity = np.asarray(asked.sum(axis=0)).ravel()
+        model = _Model(
+            users=dict(self._user_ids),
+            questions=list(self._question_info),
+            asked=asked,
+            cooccurrence=self._cooccurrence(asked) if self.cooccurrence_weight else None,
+            affinity=(asked @ membership.T).tocsr(),
+            by_category=membership.multiply(popularity).tocsr(),
+            built_at=time.time(),
+        )
+        RECOMMENDER_SIZE.labels(dimension="users").set(n_users)
+        RECOMMENDER_SIZE.labels(dimension="questions").set(n_questions)
+        RECOMMENDER_SIZE.labels(dimension="interactions").set(asked.nnz)
+        return model
+
+    async def refresh(self, full: bool = False) -> Dict:
+        """Read new history from the graph and swap in a rebuilt model"""
+        kind = "full" if full else "incremental"
+        async with self._lock:
+            start = time.perf_counter()
+            try:
+                if full:
+                    self._reset()
+                fetched = await self._fetch()
+                if fetched or full or not self._model.built_at:
+                    # Matrix assembly is CPU-bound; keep it off the event loop
+                    self._model = await asyncio.to_thread(self._build)
+                else:
+                    self._model.built_at = time.time()
+            except Exception:
+                RECOMMENDER_REFRESHES.labels(kind=kind, outcome="error").inc()
+                raise
+            elapsed = time.perf_counter() - start
+            RECOMMENDER_REFRESHES.labels(kind=kind, outcome="ok").inc()
+            RECOMMENDER_REFRESH_TIME.labels(kind=kind).observe(elapsed)
+            RECOMMENDER_LAST_REFRESH.set(self._model.built_at)
+            logger.info(f"Recommendations refreshed ({kind}): {fetched} new questions in {elapsed:.2f}s")
+            return {"kind": kind, "new_questions": fetched, "seconds": round(elapsed, 3), **self.stats()}
+
+    def _scores(self, model: _Model, row: int) -> np.ndarray:
+        # Category affinity: popular questions in the categories this user asks about
+        scores = (model.affinity[row] @ model.by_category).toarray().ravel()
+        if scores.max(initial=0) > 0:
+            scores /= scores.max()
+        # Co-occurrence: questions asked by users who asked the same questions
+        if model.cooccurrence is not None:
+            co = (model.asked[row] @ model.cooccurrence).toarray().ravel()
+            if co.max(initial=0) > 0:
+                scores += self.cooccurrence_weight * co / co.max()
+        # Never recommend what the user already asked
+        scores[model.asked[row].indices] = 0
+        return scores
+
+    def recommend(self, user_id: str, limit: int = 5) -> List[Dict]:
+        """Top questions for `user_id` as {question, answer, category}; [] for unknown users"""
+        start = time.perf_counter()
+        model = self._model
+        row = model.users.get(user_id)
+        if row is None:
+            return []
+        top = model.cache.get(user_id)
+        hit = top is not None
+        if hit:
+            model.cache.move_to_end(user_id)
+        else:
+            scores = self._scores(model, row)
+            n = min(self.top_n, int(np.count_nonzero(scores)))
+            top = []
+            if n:
+                best = np.argpartition(-scores, n - 1)[:n]
+                top = [model.questions[i] for i in best[np.argsort(-scores[best])]]
+            model.cache[user_id] = top
+            if len(model.cache) > RECOMMENDER_CACHE_SIZE:
+                model.cache.popitem(last=False)
+        RECOMMENDER_LATENCY.labels(cache="hit" if hit else "miss").observe(time.perf_counter() - start)
+        return top[:limit]
+
+    def stats(self) -> Dict:
+        model = self._model
+        return {
+            "users": len(model.users),
+            "questions": len(model.questions),
+            "interactions": int(model.asked.nnz) if model.asked is not None else 0,
+            "watermark": self._since,
+            "staleness_seconds": round(self.staleness(), 1) if model.built_at else None,
+            "cached_users": len(model.cache),
+        }
@@ -0,0 +1,197 @@
+"""
+Append-only session store
+Per-session Redis list of messages plus a metadata hash, each load/save is a single round trip,
+and a sorted-set index of sessions by last activity for analytics
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import redis.asyncio as redis
+
+# ----- Config -----
+SESSION_TTL = int(os.getenv("SESSION_TTL_SECONDS", "259200"))  # 3 days
+SESSION_MAX_MESSAGES = int(os.getenv("SESSION_MAX_MESSAGES", "1000"))
+
+# Session ids scored by last activity (epoch seconds) and a lifetime counter
+ACTIVITY_INDEX_KEY = "sessions:by_activity"
+CREATED_COUNTER_KEY = "sessions:created_total"
+_SUMMARY_FIELDS = ("created_at", "last_activity", "message_count")
+
+logger = logging.getLogger(__name__)
+
+
+def messages_key(session_id: str) -> str:
+    return f"sess:{session_id}:log"
+
+
+def metadata_key(session_id: str) -> str:
+    return f"sess:{session_id}:meta"
+
+
+def _legacy_keys(session_id: str) -> Tuple[str, str]:
+    # Pre-list layout: whole context as one JSON string plus a JSON metadata string
+    return f"sess:{session_id}", f"meta:{session_id}"
+
+
+def _ts() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _decode_metadata(raw: Dict) -> Dict:
+    metadata = dict(raw)
+    if "message_count" in metadata:
+        metadata["message_count"] = int(metadata["message_count"])
+    return metadata
+
+
+def _encode_cursor(score: float, session_id: str) -> str:
+    return f"{score!r}:{session_id}"
+
+
+def _decode_cursor(cursor: str) -> Tuple[float, str]:
+    score, _, session_id = cursor.partition(":")
+    return float(score), session_id
+
+
+class SessionStore:
+    """Messages are RPUSHed to `sess:{id}:log` (trimmed to `max_messages`),
+    metadata lives in the `sess:{id}:meta` hash. Appending a turn costs the
+    same regardless of how long the conversation already is.
+    """
+
+    def __init__(self, redis_client, ttl: int = SESSION_TTL,
+                 max_messages: int = SESSION_MAX_MESSAGES):
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.max_messages = max_messages
+
+    async def load(self, session_id: str, last_turns: Optional[int] = None) -> Tuple[List[Dict], Dict]:
+        """Messages (optionally only the last `last_turns` user/assistant pairs) and metadata"""
+        start = -2 * last_turns if last_turns else 0
+        legacy_ctx, legacy_meta = _legacy_keys(session_id)
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.lrange(messages_key(session_id), start, -1)
+            pipe.hgetall(metadata_key(session_id))
+            pipe.get(legacy_ctx)
+            pipe.get(legacy_meta)
+            raws, metadata, legacy_raw, legacy_meta_raw = await pipe.execute()
+
+        if not raws and legacy_raw:
+            messages = await self._migrate(session_id, legacy_raw, legacy_meta_raw)
+            if messages is not None:
+                return messages[start:], self._with_defaults(
+                    json.loads(legacy_meta_raw) if legacy_meta_raw else {}
+                )
+            return await self.load(session_id, last_turns)
+        return [json.loads(raw) for raw in raws], self._with_defaults(_decode_metadata(metadata))
+
+    def _with_defaults(self, metadata: Dict) -> Dict:
+        metadata.setdefault("created_at", _ts())
+        metadata.setdefault("message_count", 0)
+        return metadata
+
+    async def _migrate(self, session_id: str, legacy_raw: str,
+                       legacy_meta_raw: Optional[str]) -> Optional[List[Dict]]:
+        """Move a legacy JSON-string session into the list layout (once per session).
+
+        Returns the migrated messages, or None if another request got there first.
+        """
+        log_key, meta_key = messages_key(session_id), metadata_key(session_id)
+        legacy_keys = _legacy_keys(session_id)
+        messages = json.loads(legacy_raw)[-self.max_messages:]
+        metadata = json.loads(legacy_meta_raw) if legacy_meta_raw else {}
+        try:
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                await pipe.watch(log_key, legacy_keys[0])
+                if await pipe.exists(log_key) or not await pipe.exists(legacy_keys[0]):
+                    return None
+                pipe.multi()
+                if messages:
+                    pipe.rpush(log_key, *[json.dumps(m) for m in messages])
+                    pipe.expire(log_key, self.ttl)
+                fields = {k: v for k, v in metadata.items() if isinstance(v, (str, int, float))}
+                if fields:
+                    pipe.hset(meta_key, mapping=fields)
+                    pipe.expire(meta_key, self.ttl)
+                pipe.delete(*legacy_keys)
+                pipe.zadd(ACTIVITY_INDEX_KEY, {session_id: time.time()})
+                pipe.incr(CREATED_COUNTER_KEY)
+                await pipe.execute()
+        except redis.WatchError:
+            return None
+        logger.info(f"Migrated legacy session {session_id} ({len(messages)} messages)")
+        return messages
+
+    async def append(self, session_id: str, messages: List[Dict], turns: int = 1):
+        """RPUSH the new messages, update metadata and the activity index in one MULTI"""
+        log_key, meta_key = messages_key(session_id), metadata_key(session_id)
+        now = _ts()
+        epoch = time.time()
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.hsetnx(meta_key, "created_at", now)
+            if messages:
+                pipe.rpush(log_key, *[json.dumps(m) for m in messages])
+                pipe.ltrim(log_key, -self.max_messages, -1)
+                pipe.expire(log_key, self.ttl)
+            pipe.hset(meta_key, "last_activity", now)
+            pipe.hincrby(meta_key, "message_count", turns)
+            pipe.expire(meta_key, self.ttl)
+            pipe.zadd(ACTIVITY_INDEX_KEY, {session_id: epoch})
+            # Drop sessions whose keys have expired since their last activity
+            pipe.zremrangebyscore(ACTIVITY_INDEX_KEY, "-inf", f"({epoch - self.ttl}")
+            results = await pipe.execute()
+        if results[0]:
+            # First write for this session; happens once per session lifetime
+            await self.redis_client.incr(CREATED_COUNTER_KEY)
+
+    async def delete(self, session_id: str):
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.delete(messages_key(session_id), metadata_key(session_id), *_legacy_keys(session_id))
+            pipe.zrem(ACTIVITY_INDEX_KEY, session_id)
+            await pipe.execute()
+
+    async def recent(self, limit: int = 100, cursor: Optional[str] = None) -> Dict:
+        """Page of sessions, most recently active first.
+
+        `cursor` is the `next_cursor` of the previous page. Two round trips per
+        page: the index range plus counters, then one HMGET per session.
+        """
+        max_score, after_id = _decode_cursor(cursor) if cursor else ("+inf", None)
+        # The cursor's own entry comes back too (inclusive max), so fetch one extra
+        fetch = limit + (2 if cursor else 1)
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.zrevrangebyscore(ACTIVITY_INDEX_KEY, max_score, "-inf",
+                                  start=0, num=fetch, withscores=True)
+            pipe.zcard(ACTIVITY_INDEX_KEY)
+            pipe.get(CREATED_COUNTER_KEY)
+            entries, active, created = await pipe.execute()
+
+        # Ties on the cursor's score are ordered by member, descending
+        more = len(entries) == fetch
+        if after_id is not None:
+            entries = [(m, s) for m, s in entries if s < max_score or m < after_id]
+        page = entries[:limit]
+
+        sessions = []
+        if page:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for session_id, _ in page:
+                    pipe.hmget(metadata_key(session_id), *_SUMMARY_FIELDS)
+                rows = await pipe.execute()
+            for (session_id, _), values in zip(page, rows):
+                if not any(values):
+                    continue  # expired but not yet pruned from the index
+                metadata = _decode_metadata({k: v for k, v in zip(_SUMMARY_FIELDS, values) if v is not None})
+                sessions.append(dict(metadata, session_id=session_id))
+
+        return {
+            "sessions": sessions,
+            "next_cursor": _encode_cursor(page[-1][1], page[-1][0]) if more and page else None,
+            "active_sessions": active,
+            "total_created": int(created or 0),
+        }
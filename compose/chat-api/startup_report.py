@@ -0,0 +1,168 @@
+"""
+Startup phase timing and readiness
+Records how long imports, model loads and connection setup take, warms components in the
+background so the server can answer liveness checks at once, and reports readiness once
+every required component is up
+"""
+
+import asyncio
+import importlib
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from prometheus_client import Gauge
+
+# ----- Config -----
+STARTUP_RETRY_MAX = float(os.getenv("STARTUP_RETRY_MAX_SECONDS", "30"))  # backoff cap for required components
+
+# ----- Prometheus Metrics -----
+STARTUP_PHASE_SECONDS = Gauge('startup_phase_seconds', 'Duration of each startup phase', ['phase', 'kind'])
+STARTUP_READY_SECONDS = Gauge('startup_ready_seconds', 'Process start until every required component was ready')
+COMPONENT_READY = Gauge('startup_component_ready', '1 once a component is ready', ['component', 'required'])
+
+logger = logging.getLogger(__name__)
+
+# Fallback start time: the first import of this module
+PROCESS_STARTED = time.perf_counter()
+
+# Seconds of phases recorded inside the component setup running in this task
+_nested: ContextVar[Optional[List[float]]] = ContextVar("startup_nested_phases", default=None)
+
+
+class StartupReport:
+    """Phase timings plus the readiness of named components.
+
+    Required components gate readiness; optional ones are reported but can
+    finish warming while the service already takes traffic.
+    """
+
+    def __init__(self, service: str, started: float = PROCESS_STARTED):
+        self.service = service
+        self.started = started
+        self.phases: List[Dict] = []
+        self.components: Dict[str, Dict] = {}
+        self.ready_after: Optional[float] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def record(self, phase: str, kind: str, seconds: float):
+        nested = _nested.get()
+        if nested is not None:
+            nested.append(seconds)
+        self.phases.append({"phase": phase, "kind": kind, "seconds": round(seconds, 4)})
+        STARTUP_PHASE_SECONDS.labels(phase=phase, kind=kind).set(seconds)
+
+    @contextmanager
+    def phase(self, name: str, kind: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, kind, time.perf_counter() - start)
+
+    async def import_module(self, name: str) -> Any:
+        """Import `name` on a worker thread so a slow import does not stall the event loop"""
+        start = time.perf_counter()
+        module = await asyncio.to_thread(importlib.import_module, name)
+        self.record(f"import {name}", "import", time.perf_counter() - start)
+        return module
+
+    def expect(self, name: str, required: bool = True):
+        """Declare a component before it starts, so readiness waits for it"""
+        self.components[name] = {"required": required, "status": "pending", "seconds": None, "attempts": 0,
+                                 "error": None}
+        COMPONENT_READY.labels(component=name, required=str(required).lower()).set(0)
+
+    async def run(self, name: str, setup: Callable[[], Awaitable], kind: Optional[str] = "connection",
+                  required: bool = True, retry_max: float = STARTUP_RETRY_MAX) -> bool:
+        """Run `setup()` as component `name`; failures are recorded, not raised.
+
+        Required components are retried with backoff (except for missing
+        modules) until they come up. Only the successful attempt is recorded as
+        a phase; it excludes the imports and loads that attempt recorded itself,
+        and with `kind=None` none is recorded for the component.
+        """
+        if name not in self.components:
+            self.expect(name, required)
+        attempt = 0
+        while True:
+            error = await self._attempt(name, setup, kind)
+            if error is None:
+                return True
+            if not required or isinstance(error, ImportError):
+                return False
+            delay = min(2 ** attempt, retry_max)
+            attempt += 1
+            self.components[name]["status"] = "retrying"
+            logger.warning(f"{self.service}: retrying {name} in {delay:.0f}s")
+            await asyncio.sleep(delay)
+
+    async def _attempt(self, name: str, setup: Callable[[], Awaitable], kind: Optional[str]) -> Optional[Exception]:
+        component = self.components[name]
+        component["status"] = "starting"
+        component["attempts"] += 1
+        nested = []
+        token = _nested.set(nested)
+        start = time.perf_counter()
+        try:
+            await setup()
+        except Exception as e:
+            component.update(status="failed", error=str(e))
+            logger.error(f"{self.service}: {name} failed to start: {e}")
+            return e
+        finally:
+            elapsed = time.perf_counter() - start
+            _nested.reset(token)
+            component["seconds"] = round(elapsed, 4)
+        if kind is not None:
+            self.record(name, kind, max(elapsed - sum(nested), 0.0))
+        component.update(status="ready", error=None)
+        COMPONENT_READY.labels(component=name, required=str(component["required"]).lower()).set(1)
+        if self.ready_after is None and self.ready:
+            self.ready_after = time.perf_counter() - self.started
+            STARTUP_READY_SECONDS.set(self.ready_after)
+            logger.info(f"{self.service} ready after {self.ready_after:.2f}s")
+        return None
+
+    def launch(self, warmup: Awaitable) -> asyncio.Task:
+        """Run `warmup` in the background and log the timing report when it finishes"""
+        async def run():
+            try:
+                await warmup
+            finally:
+                logger.info(f"{self.service} startup report: {self.summary()}")
+        task = asyncio.create_task(run())
+        self._tasks.append(task)
+        return task
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    @property
+    def ready(self) -> bool:
+        return all(c["status"] == "ready" for c in self.components.values() if c["required"])
+
+    def readiness(self) -> Dict:
+        failed = any(c["status"] == "failed" for c in self.components.values() if c["required"])
+        return {
+            "status": "ready" if self.ready else "failed" if failed else "starting",
+            "components": {name: c["status"] for name, c in self.components.items()},
+        }
+
+    def summary(self) -> Dict:
+        totals: Dict[str, float] = {}
+        for p in self.phases:
+            totals[p["kind"]] = round(totals.get(p["kind"], 0.0) + p["seconds"], 4)
+        return {
+            "service": self.service,
+            "ready": self.ready,
+            "ready_after_seconds": round(self.ready_after, 3) if self.ready_after is not None else None,
+            "totals_by_kind": totals,
+            "phases": self.phases,
+            "components": self.components,
+        }
@@ -0,0 +1,73 @@
+"""
+Rate limiter against fakeredis
+Local time is simulated so spaced traffic runs instantly; the Redis window is the real server clock
+
+    pip install pytest "fakeredis[lua]" && python -m pytest tests
+"""
+
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import fakeredis.aioredis
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import rate_limiter  # noqa: E402
+from rate_limiter import RateLimiter  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", SimpleNamespace(monotonic=fake.monotonic,
+                                                              perf_counter=time.perf_counter))
+    return fake
+
+
+async def _send(limiter: RateLimiter, clock: FakeClock, count: int, spacing: float):
+    allowed = 0
+    for _ in range(count):
+        if (await limiter.hit("user:1", 60, 60)).allowed:
+            allowed += 1
+        clock.now += spacing
+    return allowed
+
+
+def _limiter(**options) -> RateLimiter:
+    return RateLimiter(fakeredis.aioredis.FakeRedis(), name="test", **options)
+
+
+@pytest.mark.parametrize("local_fraction", [0, 0.1])
+def test_spaced_requests_get_the_full_limit(clock, local_fraction):
+    limiter = _limiter(local_fraction=local_fraction, lease_seconds=1.0)
+    # One more than the limit: only the 61st is denied
+    assert asyncio.run(_send(limiter, clock, 61, 1.1)) == 60
+
+
+def test_burst_is_capped_at_the_limit(clock):
+    limiter = _limiter(local_fraction=0.1, lease_seconds=1.0)
+    assert asyncio.run(_send(limiter, clock, 100, 0.0)) == 60
+
+
+def test_expired_lease_tokens_are_given_back(clock):
+    limiter = _limiter(local_fraction=0.1, lease_seconds=1.0)
+
+    async def scenario():
+        # A short burst takes a lease, then traffic slows down and the lease expires unused
+        burst = await _send(limiter, clock, 3, 0.1)
+        clock.now += 5
+        return burst + await _send(limiter, clock, 100, 1.1)
+
+    assert asyncio.run(scenario()) == 60
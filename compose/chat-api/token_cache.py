@@ -0,0 +1,119 @@
+"""
+Verified-JWT cache
+Bounded LRU of decoded claims keyed by a SHA-256 of the token, honouring each token's exp
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import jwt
+from prometheus_client import Counter, Gauge
+
+# ----- Config -----
+JWT_CACHE_MAX_ENTRIES = int(os.getenv("JWT_CACHE_MAX_ENTRIES", "10000"))
+JWT_CACHE_MAX_TTL = float(os.getenv("JWT_CACHE_MAX_TTL_SECONDS", "300"))
+
+# ----- Prometheus Metrics -----
+JWT_CACHE_LOOKUPS = Counter('jwt_cache_lookups_total', 'Token verifications by cache result', ['result'])
+JWT_CACHE_SIZE = Gauge('jwt_cache_entries', 'Verified tokens held in the cache')
+
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+class TokenCache:
+    """Skips signature verification and claim parsing for recently seen tokens.
+
+    An entry lives until the token's `exp` or `max_ttl`, whichever is first,
+    so a cached token never outlives its own expiry. `is_revoked(digest,
+    claims)` is consulted on every call, hits included; `revoke()` covers
+    the in-process case (e.g. logout on this worker). Safe to share between
+    threads, e.g. sync FastAPI dependencies running in the threadpool.
+    """
+
+    def __init__(self, secret: str, algorithms: List[str],
+                 max_entries: int = JWT_CACHE_MAX_ENTRIES,
+                 max_ttl: float = JWT_CACHE_MAX_TTL,
+                 is_revoked: Optional[Callable[[bytes, Dict], bool]] = None):
+        self.secret = secret
+        self.algorithms = algorithms
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self.is_revoked = is_revoked
+        self._entries: "OrderedDict[bytes, Tuple[Dict, float]]" = OrderedDict()
+        self._revoked: Dict[bytes, float] = {}
+        # Guards both dicts; jwt.decode and is_revoked run outside it
+        self._lock = threading.Lock()
+
+    def verify(self, token: str) -> Dict:
+        """Decoded claims; raises the same jwt exceptions as jwt.decode"""
+        digest = token_digest(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                result = "miss"
+            elif now < entry[1]:
+                self._entries.move_to_end(digest)
+                result = "hit"
+            else:
+                self._entries.pop(digest, None)
+                result = "expired"
+        if result == "hit":
+            claims = entry[0]
+            self._check_revoked(digest, claims, now)
+            JWT_CACHE_LOOKUPS.labels(result="hit").inc()
+            return dict(claims)
+        JWT_CACHE_LOOKUPS.labels(result=result).inc()
+
+        claims = jwt.decode(token, self.secret, algorithms=self.algorithms)
+        self._check_revoked(digest, claims, now)
+        expires_at = now + self.max_ttl
+        if "exp" in claims:
+            expires_at = min(expires_at, float(claims["exp"]))
+        with self._lock:
+            self._entries[digest] = (claims, expires_at)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            size = len(self._entries)
+        JWT_CACHE_SIZE.set(size)
+        return dict(claims)
+
+    def _check_revoked(self, digest: bytes, claims: Dict, now: float):
+        with self._lock:
+            revoked_until = self._revoked.get(digest)
+            if revoked_until is not None and now >= revoked_until:
+                self._revoked.pop(digest, None)
+                revoked_until = None
+        if revoked_until is not None or (self.is_revoked and self.is_revoked(digest, claims)):
+            with self._lock:
+                self._entries.pop(digest, None)
+            JWT_CACHE_LOOKUPS.labels(result="revoked").inc()
+            raise jwt.InvalidTokenError("Token revoked")
+
+    def revoke(self, token: str, until: Optional[float] = None):
+        """Reject `token` in this process until `until` (defaults to its exp)"""
+        digest = token_digest(token)
+        now = time.time()
+        if until is None:
+            try:
+                claims = jwt.decode(token, options={"verify_signature": False})
+            except jwt.InvalidTokenError:
+                claims = {}
+            until = claims.get("exp", now + self.max_ttl)
+        with self._lock:
+            self._revoked = {d: t for d, t in self._revoked.items() if t > now}
+            self._revoked[digest] = float(until)
+            self._entries.pop(digest, None)
+            size = len(self._entries)
+        JWT_CACHE_SIZE.set(size)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        JWT_CACHE_SIZE.set(0)
@@ -0,0 +1,123 @@
+"""
+Micro-batching embedding engine
+Concurrent encode() calls share one SentenceTransformer forward pass off the event loop
+"""
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+from prometheus_client import Counter, Histogram
+
+# ----- Config -----
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "32"))
+EMBEDDING_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5"))
+EMBEDDING_QUEUE_SIZE = int(os.getenv("EMBEDDING_QUEUE_SIZE", "1024"))
+
+# ----- Prometheus Metrics -----
+EMBEDDING_BATCH_SIZE = Histogram(
+    'embedding_batch_size', 'Texts encoded per forward pass',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+EMBEDDING_QUEUE_WAIT = Histogram('embedding_queue_wait_seconds', 'Time a text waited for its batch')
+EMBEDDING_ENCODE_TIME = Histogram('embedding_encode_seconds', 'Duration of one batched encode call')
+EMBEDDING_TEXTS = Counter('embedding_texts_total', 'Texts submitted to the embedding engine', ['outcome'])
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingEngine:
+    """Queues encode requests and runs them as batches on a dedicated executor"""
+
+    def __init__(self, model, model_name: str = "all-MiniLM-L6-v2",
+                 max_batch_size: int = EMBEDDING_MAX_BATCH_SIZE,
+                 max_wait_ms: float = EMBEDDING_MAX_WAIT_MS,
+                 queue_size: int = EMBEDDING_QUEUE_SIZE):
+        self.model = model
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+        self._worker: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the batching worker"""
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+            logger.info(f"Embedding engine started (batch={self.max_batch_size}, wait={self.max_wait * 1000:.1f}ms)")
+
+    async def close(self):
+        """Stop the worker and fail anything still queued"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        while not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Embedding engine closed"))
+        self._executor.shutdown(wait=False)
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Embed one text; resolves once its batch has been encoded"""
+        if self._worker is None:
+            await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> List[Tuple[str, asyncio.Future, float]]:
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, batch_size=len(texts)), dtype=np.float32)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # Callers that gave up (request cancelled) do not need a vector
+            batch = [item for item in batch if not item[1].cancelled()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                EMBEDDING_QUEUE_WAIT.observe(started - enqueued)
+            EMBEDDING_BATCH_SIZE.observe(len(batch))
+
+            try:
+                vectors = await loop.run_in_executor(
+                    self._executor, self._encode_batch, [text for text, _, _ in batch]
+                )
+            except Exception as e:
+                logger.error(f"Batched embedding failed: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                EMBEDDING_TEXTS.labels(outcome="error").inc(len(batch))
+                continue
+
+            EMBEDDING_ENCODE_TIME.observe(time.perf_counter() - started)
+            for (_, future, _), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+            EMBEDDING_TEXTS.labels(outcome="ok").inc(len(batch))
@@ -0,0 +1,187 @@
+"""
+Keyword intent engine
+Compiles a {category: {"keywords": [...], "response": ...}} table into an Aho-Corasick
+automaton and scores every category in a single pass over the message
+"""
+
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# ----- Config -----
+INTENTS_RELOAD_INTERVAL = float(os.getenv("INTENTS_RELOAD_INTERVAL_SECONDS", "5"))
+
+# Scoring strategies, matching the behaviour of the loops this replaces:
+#   first    - earliest category (table order) with any keyword in the message
+#   count    - number of keywords found, ties go to the earlier category
+#   weighted - 10 if a keyword is the whole message, 5 if it is a whole word, else 2
+# Like those loops, keywords are matched as written against the lower-cased message,
+# so a keyword with capitals never matches, and a keyword listed twice counts twice.
+STRATEGIES = ("first", "count", "weighted")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IntentMatch:
+    category: str
+    score: float
+    response: str
+
+
+class _Automaton:
+    """Aho-Corasick over the keywords; outputs are merged along fail links"""
+
+    def __init__(self, patterns: List[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[int]] = [[]]
+        for pid, pattern in enumerate(patterns):
+            state = 0
+            for ch in pattern:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append(pid)
+
+        queue = list(self.goto[0].values())
+        for state in queue:  # breadth-first, the list grows while we walk it
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def scan(self, text: str) -> List[Tuple[int, int]]:
+        """(pattern id, end index exclusive) for every occurrence, overlaps included"""
+        goto, fail, out = self.goto, self.fail, self.out
+        hits = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                end = i + 1
+                hits.extend((pid, end) for pid in out[state])
+        return hits
+
+
+class IntentEngine:
+    """Single-pass keyword matcher with optional hot reload of the table from a JSON file"""
+
+    def __init__(self, table: Dict[str, Dict], strategy: str = "count",
+                 path: Optional[str] = None, reload_interval: float = INTENTS_RELOAD_INTERVAL):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown intent strategy {strategy!r}")
+        self.strategy = strategy
+        self.path = path
+        self.reload_interval = reload_interval
+        self._mtime = None
+        self._checked_at = 0.0
+        self._compile(table)
+        if path:
+            self.reload()
+
+    def _compile(self, table: Dict[str, Dict]):
+        categories = list(table)
+        patterns: List[str] = []
+        index: Dict[str, int] = {}
+        owners: List[List[int]] = []  # pattern id -> category indexes
+        for cid, category in enumerate(categories):
+            for keyword in table[category]["keywords"]:
+                if not keyword:
+                    continue
+                if keyword != keyword.lower():
+                    logger.warning(f"Intent keyword {keyword!r} in {category!r} has capitals and never matches")
+                pid = index.get(keyword)
+                if pid is None:
+                    pid = index[keyword] = len(patterns)
+                    patterns.append(keyword)
+                    owners.append([])
+                owners[pid].append(cid)
+        # Swap everything in one assignment so concurrent readers see old or new, never a mix
+        self._state = (
+            categories,
+            [table[c]["response"] for c in categories],
+            [float(table[c].get("weight", 1)) for c in categories],
+            patterns,
+            [any(ch.isspace() for ch in p) for p in patterns],
+            owners,
+            _Automaton(patterns),
+        )
+
+    def reload(self) -> bool:
+        """Re-read `path` if it changed; keeps the current table on any error"""
+        self._checked_at = time.monotonic()
+        try:
+            mtime = os.stat(self.path).st_mtime
+            if mtime == self._mtime:
+                return False
+            with open(self.path, encoding="utf-8") as f:
+                table = json.load(f)
+            self._compile(table)
+            self._mtime = mtime
+            logger.info(f"Loaded {len(table)} intents from {self.path}")
+            return True
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Failed to load intents from {self.path}: {e}")
+            self._mtime = None
+            return False
+
+    def scores(self, message: str) -> List[float]:
+        """Score of every category, in table order"""
+        if self.path and time.monotonic() - self._checked_at >= self.reload_interval:
+            self.reload()
+        categories, _, weights, patterns, has_space, owners, automaton = self._state
+        text = message.lower().strip()
+
+        # Best weight per keyword; each keyword counts once however often it occurs in the message
+        found: Dict[int, float] = {}
+        for pid, end in automaton.scan(text):
+            if self.strategy != "weighted":
+                found[pid] = 1.0
+                continue
+            start = end - len(patterns[pid])
+            if start == 0 and end == len(text):
+                weight = 10.0
+            elif (not has_space[pid] and (start == 0 or text[start - 1].isspace())
+                  and (end == len(text) or text[end].isspace())):
+                weight = 5.0
+            else:
+                weight = 2.0
+            if weight > found.get(pid, 0.0):
+                found[pid] = weight
+
+        totals = [0.0] * len(categories)
+        for pid, weight in found.items():
+            for cid in owners[pid]:
+                totals[cid] += weight
+        return [total * w for total, w in zip(totals, weights)]
+
+    def match(self, message: str, min_score: float = 0.0) -> Optional[IntentMatch]:
+        """Best category for `message`, or None when nothing scores above `min_score`"""
+        totals = self.scores(message)
+        categories, responses = self._state[0], self._state[1]
+        best = None
+        for cid, score in enumerate(totals):
+            if score <= 0 or score < min_score:
+                continue
+            if self.strategy == "first":
+                best = cid
+                break
+            if best is None or score > totals[best]:
+                best = cid
+        if best is None:
+            return None
+        return IntentMatch(categories[best], totals[best], responses[best])
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Login throughput benchmark for the auth-service
+Compares bcrypt on the event loop (before) with the process-pool hasher (after)
+
+Local mode, no services needed:
+    python scripts/benchmark_auth_login.py local --concurrency 32 --duration 10
+
+Against a running auth-service (run once per build to compare):
+    python scripts/benchmark_auth_login.py live --url http://localhost:8001 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "compose", "auth-service"))
+
+
+def _report(label: str, latencies, rejected: int, elapsed: float, lag=None):
+    ok = len(latencies)
+    latencies = sorted(latencies) or [0.0]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    line = (f"{label:<10} {ok / elapsed:8.1f} req/s  p50 {statistics.median(latencies) * 1000:7.1f}ms  "
+            f"p99 {p99 * 1000:7.1f}ms  503s {rejected}")
+    if lag is not None:
+        line += f"  max loop lag {max(lag or [0.0]) * 1000:7.1f}ms"
+    print(line)
+
+
+async def _loop_lag(samples, stop: asyncio.Event, interval: float = 0.01):
+    """How late a 10ms timer fires: stands in for every other request on the worker"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+async def _drive(login, concurrency: int, duration: float):
+    latencies, rejected = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def user():
+        nonlocal rejected
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            if await login():
+                latencies.append(time.perf_counter() - start)
+            else:
+                rejected += 1
+                await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[user() for _ in range(concurrency)])
+    return latencies, rejected, time.perf_counter() - started
+
+
+async def run_local(args):
+    import bcrypt
+    from password_hasher import HasherBusy, PasswordHasher
+
+    hashed = bcrypt.hashpw(b"benchmark-password", bcrypt.gensalt(rounds=args.rounds)).decode()
+
+    async def inline_login():
+        bcrypt.checkpw(b"benchmark-password", hashed.encode())
+        await asyncio.sleep(0)
+        return True
+
+    hasher = PasswordHasher(workers=args.workers, rounds=args.rounds)
+    await hasher.start()
+
+    async def pooled_login():
+        try:
+            return await hasher.verify("benchmark-password", hashed)
+        except HasherBusy:
+            return False
+
+    print(f"bcrypt cost {args.rounds}, concurrency {args.concurrency}, pool workers {hasher.workers}")
+    for label, login in (("before", inline_login), ("after", pooled_login)):
+        lag, stop = [], asyncio.Event()
+        monitor = asyncio.create_task(_loop_lag(lag, stop))
+        latencies, rejected, elapsed = await _drive(login, args.concurrency, args.duration)
+        stop.set()
+        await monitor
+        _report(label, latencies, rejected, elapsed, lag)
+    await hasher.close()
+
+
+async def run_live(args):
+    import httpx
+
+    username = f"bench_{uuid.uuid4().hex[:8]}"
+    password = "benchmark-password"
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        response = await client.post("/register", json={
+            "username": username, "password": password,
+            "email": f"{username}@example.com", "organization": "benchmark"
+        })
+        response.raise_for_status()
+
+        async def login():
+            response = await client.post("/login", json={"username": username, "password": password})
+            if response.status_code == 503:
+                return False
+            response.raise_for_status()
+            return True
+
+        latencies, rejected, elapsed = await _drive(login, args.concurrency, args.duration)
+    _report(args.url, latencies, rejected, elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Auth-service login throughput benchmark")
+    parser.add_argument("mode", choices=["local", "live"])
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--rounds", type=int, default=int(os.getenv("BCRYPT_ROUNDS", "12")))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+    asyncio.run(run_local(args) if args.mode == "local" else run_live(args))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Intent matching benchmark
+Compares the per-category keyword loops the rule-based bots used (before) with the
+shared Aho-Corasick IntentEngine (after) on synthetic keyword tables of growing size
+
+    python scripts/benchmark_intent_engine.py --sizes 10 100 1000 5000 --messages 2000
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from intent_engine import IntentEngine  # noqa: E402
+
+CATEGORIES = 8
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+
+
+def _table(keywords: int, rng: random.Random):
+    table = {f"category_{c}": {"keywords": [], "response": f"response {c}"} for c in range(CATEGORIES)}
+    unique = set()
+    while len(unique) < keywords:
+        unique.add(_word(rng))
+    for i, keyword in enumerate(sorted(unique)):
+        table[f"category_{i % CATEGORIES}"]["keywords"].append(keyword)
+    return table
+
+
+def _messages(table, count: int, rng: random.Random):
+    keywords = [k for data in table.values() for k in data["keywords"]]
+    messages = []
+    for _ in range(count):
+        words = [_word(rng) for _ in range(rng.randint(5, 25))]
+        if rng.random() < 0.5:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(keywords))
+        messages.append(" ".join(words))
+    return messages
+
+
+# ----- The loops IntentEngine replaced -----
+
+def first_loop(table, message):
+    text = message.lower()
+    for category, data in table.items():
+        if any(keyword in text for keyword in data["keywords"]):
+            return category
+    return None
+
+
+def count_loop(table, message):
+    text = message.lower()
+    best, best_score = None, 0
+    for category, data in table.items():
+        score = sum(1 for keyword in data["keywords"] if keyword in text)
+        if score > best_score:
+            best, best_score = category, score
+    return best
+
+
+def weighted_loop(table, message):
+    text = message.lower().strip()
+    best, best_score = None, 0
+    for category, data in table.items():
+        score = 0
+        for keyword in data["keywords"]:
+            if keyword in text:
+                if keyword == text:
+                    score += 10
+                elif keyword in text.split():
+                    score += 5
+                else:
+                    score += 2
+        if score > best_score:
+            best, best_score = category, score
+    return best if best_score >= 2 else None
+
+
+LOOPS = {"first": first_loop, "count": count_loop, "weighted": weighted_loop}
+
+
+def _per_message_us(fn, messages) -> float:
+    start = time.perf_counter()
+    for message in messages:
+        fn(message)
+    return (time.perf_counter() - start) / len(messages) * 1e6
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    print(f"{'keywords':>8} {'strategy':<9} {'before us/msg':>14} {'after us/msg':>13} {'speedup':>8}")
+    for size in args.sizes:
+        table = _table(size, rng)
+        messages = _messages(table, args.messages, rng)
+        for strategy, loop in LOOPS.items():
+            engine = IntentEngine(table, strategy)
+            min_score = 2 if strategy == "weighted" else 0.0
+
+            def after(message, engine=engine, min_score=min_score):
+                match = engine.match(message, min_score=min_score)
+                return match.category if match else None
+
+            for message in messages[:200]:
+                expected = loop(table, message)
+                if after(message) != expected:
+                    sys.exit(f"Mismatch for {strategy} on {message!r}: {after(message)} != {expected}")
+
+            before_us = _per_message_us(lambda m, loop=loop: loop(table, m), messages)
+            after_us = _per_message_us(after, messages)
+            print(f"{size:>8} {strategy:<9} {before_us:>14.1f} {after_us:>13.1f} {before_us / after_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Intent matching benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Streaming path benchmark for the chat-api /chat generators
+Compares the old path (one HTTP chunk per token, `text += chunk`) with the coalesced path
+(coalesce_chunks + a single join) on server CPU per generated token and writes per response
+
+A uvicorn server is started in a subprocess with a simulated model behind both paths and
+driven over loopback. uvicorn issues one transport write (one send() syscall) per ASGI
+body message, so the server counts writes per response at the ASGI boundary.
+
+    python scripts/benchmark_stream_assembly.py --tokens 500 --gaps 0 5 20 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+
+CHAT_API = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "compose", "chat-api")
+sys.path.insert(0, CHAT_API)
+
+WORDS = ["שלום", "ניהול", "צוות", "פרויקט", "team", "roadmap", "אסטרטגיה", "לקוחות", ",", "."]
+
+
+def _tokens(count: int, seed: int):
+    rng = random.Random(seed)
+    return [(" " if i else "") + rng.choice(WORDS) for i in range(count)]
+
+
+# ----- Server side -----
+
+def build_app(args):
+    from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
+
+    from token_stream import FlushPolicy, coalesce_chunks
+
+    app = FastAPI()
+    tokens = _tokens(args.tokens, args.seed)
+    expected = "".join(tokens)
+    policy = FlushPolicy("benchmark", args.flush_bytes, args.flush_interval_ms / 1000)
+    counters = {"writes": 0, "responses": 0}
+
+    async def model(gap: float):
+        """Stand-in for ollama_stream: tokens `gap` seconds apart (0 = a replayed burst)"""
+        for token in tokens:
+            await asyncio.sleep(gap)
+            yield token
+
+    def counted(body):
+        async def gen():
+            async for data in body:
+                counters["writes"] += 1
+                yield data
+            counters["responses"] += 1
+        return gen()
+
+    @app.get("/before")
+    async def before(gap: float = 0.0):
+        async def gen():
+            assistant_text = ""
+            try:
+                async for chunk in model(gap):
+                    assistant_text += chunk
+                    yield chunk
+            finally:
+                assert assistant_text == expected
+        return StreamingResponse(counted(gen()), media_type="text/plain")
+
+    @app.get("/after")
+    async def after(gap: float = 0.0):
+        async def gen():
+            parts = []
+            try:
+                async for data in coalesce_chunks(model(gap), policy, collect=parts):
+                    yield data
+            finally:
+                assert "".join(parts) == expected
+        return StreamingResponse(counted(gen()), media_type="text/plain")
+
+    @app.get("/stats")
+    async def stats():
+        return {"cpu": time.process_time(), **counters}
+
+    return app
+
+
+def serve(args):
+    import uvicorn
+    uvicorn.run(build_app(args), host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
+
+
+# ----- Client side -----
+
+async def _scenario(client, path: str, gap_ms: float, requests: int, concurrency: int):
+    before = (await client.get("/stats")).json()
+    queue = list(range(requests))
+
+    async def worker():
+        while queue:
+            queue.pop()
+            async with client.stream("GET", path, params={"gap": gap_ms / 1000}) as response:
+                async for _ in response.aiter_raw():
+                    pass
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    wall = time.perf_counter() - start
+    after = (await client.get("/stats")).json()
+    responses = after["responses"] - before["responses"] - 0
+    return (after["cpu"] - before["cpu"]), (after["writes"] - before["writes"]) / max(responses, 1), wall
+
+
+def assembly(counts):
+    print("Final text assembly, whole answer (us)")
+    print(f"{'tokens':>8} {'text += chunk':>14} {'list + join':>12}")
+    for count in counts:
+        tokens = _tokens(count, count)
+
+        def concat():
+            text = ""
+            for token in tokens:
+                text += token
+            return text
+
+        def join():
+            parts = []
+            for token in tokens:
+                parts.append(token)
+            return "".join(parts)
+
+        timings = []
+        for fn in (concat, join):
+            start = time.perf_counter()
+            for _ in range(20):
+                fn()
+            timings.append((time.perf_counter() - start) / 20 * 1e6)
+        print(f"{count:>8} {timings[0]:>14.1f} {timings[1]:>12.1f}")
+    print()
+
+
+async def run(args):
+    import httpx
+
+    assembly(args.assembly_sizes)
+    server = subprocess.Popen([
+        sys.executable, os.path.abspath(__file__), "serve", "--port", str(args.port),
+        "--tokens", str(args.tokens), "--seed", str(args.seed),
+        "--flush-bytes", str(args.flush_bytes), "--flush-interval-ms", str(args.flush_interval_ms),
+    ])
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=120) as client:
+            for _ in range(100):
+                try:
+                    await client.get("/stats")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+
+            print(f"{args.tokens} tokens per response, {args.requests} responses, concurrency {args.concurrency}, "
+                  f"flush at {args.flush_bytes}B or {args.flush_interval_ms:g}ms")
+            print(f"{'gap ms':>6} {'path':<7} {'server cpu us/token':>20} {'writes/resp':>12} {'wall s':>8}")
+            for gap_ms in args.gaps:
+                for path in ("/before", "/after"):
+                    cpu, writes, wall = await _scenario(client, path, gap_ms, args.requests, args.concurrency)
+                    per_token = cpu / (args.requests * args.tokens) * 1e6
+                    print(f"{gap_ms:>6g} {path[1:]:<7} {per_token:>20.2f} {writes:>12.1f} {wall:>8.2f}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chat streaming path benchmark")
+    parser.add_argument("mode", nargs="?", choices=["run", "serve"], default="run")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tokens", type=int, default=500)
+    parser.add_argument("--gaps", type=float, nargs="+", default=[0, 5, 20],
+                        help="Milliseconds between model tokens (0 = burst, e.g. a coalesced replay)")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--flush-bytes", type=int, default=512)
+    parser.add_argument("--flush-interval-ms", type=float, default=50)
+    parser.add_argument("--assembly-sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    if args.mode == "serve":
+        serve(args)
+    else:
+        asyncio.run(run(args))
@@ -0,0 +1,148 @@
+"""
+Semantic answer cache
+Reuses a generated answer when a new query's embedding is within a cosine threshold of a cached one
+"""
+
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from prometheus_client import Counter, Gauge, Histogram
+
+# ----- Config -----
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))  # per scope
+SEMANTIC_CACHE_MAX_SCOPES = int(os.getenv("SEMANTIC_CACHE_MAX_SCOPES", "100"))
+
+# ----- Prometheus Metrics -----
+SEMANTIC_CACHE_LOOKUPS = Counter('semantic_cache_lookups_total', 'Semantic cache lookups', ['result'])
+SEMANTIC_CACHE_SIMILARITY = Histogram(
+    'semantic_cache_best_similarity', 'Best cosine similarity found per lookup',
+    buckets=(0.5, 0.7, 0.8, 0.85, 0.9, 0.93, 0.95, 0.97, 0.99, 1.0)
+)
+SEMANTIC_CACHE_LOOKUP_TIME = Histogram('semantic_cache_lookup_seconds', 'Semantic cache lookup duration')
+SEMANTIC_CACHE_SAVED = Counter('semantic_cache_saved_seconds_total', 'Generation time avoided by cache hits')
+SEMANTIC_CACHE_ENTRIES = Gauge('semantic_cache_entries', 'Answers held in the semantic cache')
+
+logger = logging.getLogger(__name__)
+
+
+def cache_scope(organization: Optional[str], model: str, prompt_version: str) -> str:
+    """Answers are only shared between queries with the same org, model and system prompt"""
+    return f"{organization or 'default'}|{model}|{prompt_version}"
+
+
+class _ScopeCache:
+    """Fixed-capacity matrix of unit query vectors plus their answers"""
+
+    def __init__(self, dim: int, capacity: int):
+        self.dim = dim
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.created = np.zeros(capacity, dtype=np.float64)
+        self.last_used = np.zeros(capacity, dtype=np.float64)
+        self.entries: List[Optional[Dict]] = [None] * capacity
+        self.size = 0
+
+    def slot(self, now: float, ttl: float) -> int:
+        """Next free slot, else an expired one, else the least recently used"""
+        if self.size < len(self.entries):
+            self.size += 1
+            return self.size - 1
+        expired = np.flatnonzero(self.created < now - ttl)
+        if len(expired):
+            return int(expired[0])
+        return int(np.argmin(self.last_used))
+
+
+class SemanticCache:
+    """Per-scope nearest-neighbour cache of generated answers (one per process)"""
+
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 ttl: float = SEMANTIC_CACHE_TTL,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+                 max_scopes: int = SEMANTIC_CACHE_MAX_SCOPES,
+                 enabled: bool = SEMANTIC_CACHE_ENABLED):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_scopes = max_scopes
+        self.enabled = enabled
+        self._scopes: "OrderedDict[str, _ScopeCache]" = OrderedDict()
+
+    @staticmethod
+    def _unit(embedding: Sequence[float]) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0.0 else None
+
+    def lookup(self, scope: str, embedding: Sequence[float]) -> Optional[Dict]:
+        """Cached answer for the nearest query above the threshold, with its similarity"""
+        if not self.enabled:
+            return None
+        start = time.perf_counter()
+        try:
+            cache = self._scopes.get(scope)
+            query = self._unit(embedding)
+            if cache is None or cache.size == 0 or query is None or query.shape != (cache.dim,):
+                SEMANTIC_CACHE_LOOKUPS.labels(result="miss").inc()
+                return None
+            self._scopes.move_to_end(scope)
+
+            now = time.time()
+            scores = cache.vectors[:cache.size] @ query
+            scores[cache.created[:cache.size] < now - self.ttl] = -1.0
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+            SEMANTIC_CACHE_SIMILARITY.observe(max(similarity, 0.0))
+            if similarity < self.threshold:
+                SEMANTIC_CACHE_LOOKUPS.labels(result="miss").inc()
+                return None
+
+            cache.last_used[best] = now
+            entry = cache.entries[best]
+            SEMANTIC_CACHE_LOOKUPS.labels(result="hit").inc()
+            SEMANTIC_CACHE_SAVED.inc(entry["generation_seconds"])
+            return dict(entry, similarity=similarity)
+        finally:
+            SEMANTIC_CACHE_LOOKUP_TIME.observe(time.perf_counter() - start)
+
+    def put(self, scope: str, embedding: Sequence[float], query: str, response: str,
+            generation_seconds: float = 0.0, tokens_used: int = 0):
+        """Remember an answer generated for `query`"""
+        if not self.enabled:
+            return
+        vector = self._unit(embedding)
+        if vector is None:
+            return
+        cache = self._scopes.get(scope)
+        if cache is None or cache.dim != len(vector):
+            cache = self._scopes[scope] = _ScopeCache(len(vector), self.max_entries)
+            while len(self._scopes) > self.max_scopes:
+                self._scopes.popitem(last=False)
+        self._scopes.move_to_end(scope)
+
+        now = time.time()
+        slot = cache.slot(now, self.ttl)
+        cache.vectors[slot] = vector
+        cache.created[slot] = now
+        cache.last_used[slot] = now
+        cache.entries[slot] = {
+            "query": query,
+            "response": response,
+            "tokens_used": tokens_used,
+            "generation_seconds": generation_seconds,
+        }
+        SEMANTIC_CACHE_ENTRIES.set(sum(c.size for c in self._scopes.values()))
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "scopes": len(self._scopes),
+            "entries": sum(c.size for c in self._scopes.values()),
+        }
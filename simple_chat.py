@@ -5,6 +5,7 @@ Simple Chat API - ללא Docker
 """
 
 import json
+import os
 import time
 from datetime import datetime
 from typing import List, Dict, Any
@@ -13,6 +14,8 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
+from intent_engine import IntentEngine
+
 # FastAPI app
 app = FastAPI(
     title="Simple Org Chatbot",
@@ -54,31 +57,44 @@ AI_RESPONSES = {
 # Simple conversation storage
 conversations = []
 
+# Keyword intents, checked in order (first match wins)
+INTENTS = {
+    "לחץ": {
+        "keywords": ["לחץ", "stress"],
+        "response": "טיפול בלחץ כולל: 1) זיהוי מקורות הלחץ 2) תרגילי נשימה עמוקה 3) ארגון זמן יעיל 4) תמיכה חברתית ומקצועית 5) פעילות גופנית סדירה 6) שינה מספקת. חשוב לזהות את הסימנים המוקדמים ולטפל בהם לפני שהם מתגברים."
+    },
+    "מדיניות": {
+        "keywords": ["מדיניות", "policy"],
+        "response": "לגבי מדיניות החברה - אני לא יכול לגשת למסמכים ספציפיים, אבל אני יכול לעזור לך להבין איך לבדוק מדיניות: 1) פנה למחלקת HR 2) בדוק בפורטל העובדים 3) שאל את המנהל הישיר 4) בדוק בהודעות החברה. איזה סוג מדיניות אתה מחפש?"
+    },
+    "צוות": {
+        "keywords": ["צוות", "team", "מנהל"],
+        "response": "ניהול צוות דורש: 1) תקשורת פתוחה וברורה 2) הגדרת יעדים מדידים 3) הקשבה לצרכים של כל חבר צוות 4) מתן משוב חיובי ובונה 5) טיפול מהיר בבעיות 6) פיתוח כישורים 7) יצירת סביבה תומכת. איזה אספקט של ניהול צוות מעניין אותך?"
+    },
+    "פרויקט": {
+        "keywords": ["פרויקט", "project"],
+        "response": "התחלת פרויקט כוללת: 1) הגדרת מטרות ברורות ומדידות 2) תכנון לוח זמנים מציאותי 3) הקצאת משאבים מתאימים 4) זיהוי וניהול סיכונים 5) יצירת צוות מתאים 6) הגדרת תהליכי עבודה 7) מערכת מעקב והערכה. איזה שלב בפרויקט אתה מתחיל?"
+    },
+    "ביצועים": {
+        "keywords": ["ביצועים", "performance", "שיפור"],
+        "response": "שיפור ביצועים כולל: 1) הגדרת יעדים מדידים וברורים 2) מתן משוב קבוע ומבנה 3) פיתוח כישורים מקצועיים 4) אוטומציה של תהליכים חוזרים 5) עבודה בצוות יעילה 6) ניהול זמן טוב 7) למידה מתמדת. איזה תחום ביצועים אתה רוצה לשפר?"
+    },
+    "שעה": {
+        "keywords": ["שעה", "time"],
+        "response": "אני לא יכול לראות את השעה הנוכחית, אבל אני כאן לעזור עם שאלות ארגוניות וניהוליות! איך אני יכול לעזור לך עם עבודה או פיתוח עסקי?"
+    },
+    "שלום": {
+        "keywords": ["שלום", "היי", "hello"],
+        "response": "שלום! אני העוזר הארגוני החכם שלך. אני כאן לעזור עם שאלות עסקיות, ניהול, פיתוח מוצרים, אסטרטגיות שיווק, וניהול צוותים. איך אני יכול לעזור לך היום?"
+    }
+}
+intent_engine = IntentEngine(INTENTS, "first", path=os.getenv("INTENTS_FILE"))
+
 def get_ai_response(message: str) -> str:
     """מחזיר תשובה חכמה לפי מילות מפתח"""
-    message_lower = message.lower().strip()
-    
-    # בדיקות ספציפיות
-    if "לחץ" in message_lower or "stress" in message_lower:
-        return "טיפול בלחץ כולל: 1) זיהוי מקורות הלחץ 2) תרגילי נשימה עמוקה 3) ארגון זמן יעיל 4) תמיכה חברתית ומקצועית 5) פעילות גופנית סדירה 6) שינה מספקת. חשוב לזהות את הסימנים המוקדמים ולטפל בהם לפני שהם מתגברים."
-    
-    elif "מדיניות" in message_lower or "policy" in message_lower:
-        return "לגבי מדיניות החברה - אני לא יכול לגשת למסמכים ספציפיים, אבל אני יכול לעזור לך להבין איך לבדוק מדיניות: 1) פנה למחלקת HR 2) בדוק בפורטל העובדים 3) שאל את המנהל הישיר 4) בדוק בהודעות החברה. איזה סוג מדיניות אתה מחפש?"
-    
-    elif "צוות" in message_lower or "team" in message_lower or "מנהל" in message_lower:
-        return "ניהול צוות דורש: 1) תקשורת פתוחה וברורה 2) הגדרת יעדים מדידים 3) הקשבה לצרכים של כל חבר צוות 4) מתן משוב חיובי ובונה 5) טיפול מהיר בבעיות 6) פיתוח כישורים 7) יצירת סביבה תומכת. איזה אספקט של ניהול צוות מעניין אותך?"
-    
-    elif "פרויקט" in message_lower or "project" in message_lower:
-        return "התחלת פרויקט כוללת: 1) הגדרת מטרות ברורות ומדידות 2) תכנון לוח זמנים מציאותי 3) הקצאת משאבים מתאימים 4) זיהוי וניהול סיכונים 5) יצירת צוות מתאים 6) הגדרת תהליכי עבודה 7) מערכת מעקב והערכה. איזה שלב בפרויקט אתה מתחיל?"
-    
-    elif "ביצועים" in message_lower or "performance" in message_lower or "שיפור" in message_lower:
-        return "שיפור ביצועים כולל: 1) הגדרת יעדים מדידים וברורים 2) מתן משוב קבוע ומבנה 3) פיתוח כישורים מקצועיים 4) אוטומציה של תהליכים חוזרים 5) עבודה בצוות יעילה 6) ניהול זמן טוב 7) למידה מתמדת. איזה תחום ביצועים אתה רוצה לשפר?"
-    
-    elif "שעה" in message_lower or "time" in message_lower:
-        return "אני לא יכול לראות את השעה הנוכחית, אבל אני כאן לעזור עם שאלות ארגוניות וניהוליות! איך אני יכול לעזור לך עם עבודה או פיתוח עסקי?"
-    
-    elif "שלום" in message_lower or "היי" in message_lower or "hello" in message_lower:
-        return "שלום! אני העוזר הארגוני החכם שלך. אני כאן לעזור עם שאלות עסקיות, ניהול, פיתוח מוצרים, אסטרטגיות שיווק, וניהול צוותים. איך אני יכול לעזור לך היום?"
+    match = intent_engine.match(message)
+    if match:
+        return match.response
     
     # תשובה כללית חכמה יותר
     return f"תודה על השאלה '{message}'. אני כאן לעזור עם שאלות ארגוניות, ניהול, פיתוח עסקי, וניהול צוותים. איזה תחום ספציפי מעניין אותך? אוכל לעזור עם ניהול, פיתוח, שיווק, או כל נושא עסקי אחר."
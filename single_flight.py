@@ -0,0 +1,180 @@
+"""
+Single-flight request coalescing
+Concurrent identical generations share one upstream call; streamed chunks are fanned out to every
+subscriber and late joiners replay the buffered prefix
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# ----- Config -----
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+# ----- Prometheus Metrics -----
+# Coalescing ratio: rate(role="follower") / rate(all roles)
+SINGLE_FLIGHT_REQUESTS = Counter(
+    'single_flight_requests_total', 'Requests that started (leader) or joined (follower) a generation',
+    ['name', 'role']
+)
+SINGLE_FLIGHT_SUBSCRIBERS = Histogram(
+    'single_flight_subscribers', 'Requests served per upstream generation', ['name'],
+    buckets=(1, 2, 3, 5, 10, 25, 50, 100)
+)
+SINGLE_FLIGHT_INFLIGHT = Gauge('single_flight_inflight', 'Upstream generations currently running', ['name'])
+SINGLE_FLIGHT_CANCELLED = Counter(
+    'single_flight_cancelled_total', 'Generations cancelled because every subscriber left', ['name']
+)
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(text: str) -> str:
+    """Case- and whitespace-insensitive form of a prompt"""
+    return " ".join(text.casefold().split())
+
+
+def flight_key(prompt: str, model: str, context: Any = None) -> str:
+    """Requests with the same normalised prompt, model and context share a key"""
+    payload = json.dumps([normalize_prompt(prompt), model, context or []],
+                         ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    """One upstream generation and what it has produced so far"""
+
+    def __init__(self):
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.joined = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait(self):
+        await self._changed.wait()
+
+
+class SingleFlight:
+    """Per-process registry of in-flight generations keyed by `flight_key`.
+
+    The upstream call runs in its own task, so it keeps going when the request
+    that started it disconnects, and is cancelled once nobody is listening.
+    """
+
+    def __init__(self, name: str, enabled: bool = SINGLE_FLIGHT_ENABLED):
+        self.name = name
+        self.enabled = enabled
+        self._flights: Dict[str, _Flight] = {}
+        self._leaders = 0
+        self._followers = 0
+
+    def _join(self, key: str, start: Callable[[_Flight], Awaitable]) -> _Flight:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight()
+            flight.task = asyncio.create_task(start(flight))
+            flight.task.add_done_callback(lambda _: self._finish(key, flight))
+            self._leaders += 1
+            role = "leader"
+        else:
+            self._followers += 1
+            role = "follower"
+        flight.subscribers += 1
+        flight.joined += 1
+        SINGLE_FLIGHT_REQUESTS.labels(name=self.name, role=role).inc()
+        SINGLE_FLIGHT_INFLIGHT.labels(name=self.name).set(len(self._flights))
+        return flight
+
+    def _finish(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        SINGLE_FLIGHT_SUBSCRIBERS.labels(name=self.name).observe(flight.joined)
+        SINGLE_FLIGHT_INFLIGHT.labels(name=self.name).set(len(self._flights))
+
+    def _leave(self, key: str, flight: _Flight):
+        flight.subscribers -= 1
+        if flight.subscribers == 0 and not flight.done:
+            # Nobody left to deliver to; free the upstream slot
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.task.cancel()
+            SINGLE_FLIGHT_CANCELLED.labels(name=self.name).inc()
+
+    @staticmethod
+    async def _pump(flight: _Flight, factory: Callable[[], AsyncIterator]):
+        try:
+            async for chunk in factory():
+                flight.chunks.append(chunk)
+                flight.notify()
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            flight.notify()
+
+    @staticmethod
+    async def _call(flight: _Flight, factory: Callable[[], Awaitable]):
+        try:
+            return await factory()
+        finally:
+            flight.done = True
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator]) -> AsyncGenerator[Any, None]:
+        """Chunks of the generation for `key`, starting `factory()` if none is running.
+
+        Every subscriber sees the full sequence from the first chunk; an error
+        raised upstream is re-raised to each of them.
+        """
+        if not self.enabled:
+            async for chunk in factory():
+                yield chunk
+            return
+
+        flight = self._join(key, lambda f: self._pump(f, factory))
+        try:
+            position = 0
+            while True:
+                if position < len(flight.chunks):
+                    yield flight.chunks[position]
+                    position += 1
+                    continue
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await flight.wait()
+        finally:
+            self._leave(key, flight)
+
+    async def run(self, key: str, factory: Callable[[], Awaitable]) -> Any:
+        """Result of `factory()`, shared with every concurrent caller using the same key"""
+        if not self.enabled:
+            return await factory()
+
+        flight = self._join(key, lambda f: self._call(f, factory))
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            self._leave(key, flight)
+
+    def stats(self) -> Dict:
+        total = self._leaders + self._followers
+        return {
+            "enabled": self.enabled,
+            "inflight": len(self._flights),
+            "upstream_calls": self._leaders,
+            "coalesced_requests": self._followers,
+            "coalescing_ratio": self._followers / total if total else 0.0,
+        }
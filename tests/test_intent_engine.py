@@ -0,0 +1,78 @@
+"""
+IntentEngine against the keyword loops it replaced
+Every shipped intent table must route messages exactly as the old per-category loops did
+
+    pip install pytest && python -m pytest tests
+"""
+
+import ast
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+from benchmark_intent_engine import LOOPS  # noqa: E402
+from intent_engine import IntentEngine  # noqa: E402
+
+# (file, name the table is assigned to, strategy the app uses)
+SHIPPED = [
+    ("simple_chat.py", "INTENTS", "first"),
+    ("api/main.py", "INTENTS", "first"),
+    ("compose/chat-api/app_simple.py", "INTENTS", "first"),
+    ("backend/main.py", "self.responses_db", "count"),
+    ("enterprise_simple_backend.py", "self.responses_db", "weighted"),
+]
+
+MESSAGES = [
+    # Keywords inside longer words: "AI" must not start matching "email", "said" or "training"
+    "email marketing plan",
+    "help with sales emails",
+    "I said hello",
+    "AI training for the team",
+    "how do we use ai in our tech stack",
+    "שלום",
+    "hello",
+    "אני בלחץ מהצוות",
+    "stress and pressure at work",
+    "לחץ",
+    "team management and leadership",
+    "business development and growth",
+    "marketing to new customers",
+    "what is the policy on regulations",
+    "פיתוח עסקי וצמיחה",
+    "מה השעה",
+    "project performance review",
+    "",
+    "nothing relevant here",
+]
+
+
+def _table(path: str, target: str):
+    """The dict literal assigned to `target` in `path`, read without importing the app"""
+    with open(os.path.join(ROOT, path), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and any(ast.unparse(t) == target for t in node.targets):
+            return ast.literal_eval(node.value)
+    raise LookupError(f"{target} not found in {path}")
+
+
+def _keywords(table):
+    return [k for data in table.values() for k in data["keywords"]]
+
+
+@pytest.mark.parametrize("path,target,strategy", SHIPPED)
+def test_shipped_tables_route_like_the_old_loops(path, target, strategy):
+    table = _table(path, target)
+    engine = IntentEngine(table, strategy)
+    loop = LOOPS[strategy]
+    min_score = 2 if strategy == "weighted" else 0.0
+    # Every keyword alone, inside a sentence and glued to another word, plus the fixed cases
+    messages = MESSAGES + [m for k in _keywords(table) for m in (k, f"tell me about {k} please", f"x{k}y")]
+    for message in messages:
+        match = engine.match(message, min_score=min_score)
+        assert (match.category if match else None) == loop(table, message), message
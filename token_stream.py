@@ -0,0 +1,250 @@
+"""
+Token streaming helpers
+Times an async token stream (time to first token, inter-token gap, tokens/s), coalesces tokens
+into fewer, larger HTTP chunks and serves them as Server-Sent Events or chunked text, running
+persistence only after the stream has closed
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
+from prometheus_client import Counter, Histogram
+from starlette.background import BackgroundTask
+
+# ----- Config -----
+STREAM_FORMATS = {
+    "sse": "text/event-stream; charset=utf-8",
+    "text": "text/plain; charset=utf-8",
+}
+# Defaults for every endpoint; STREAM_FLUSH_BYTES_<ENDPOINT> etc. override them per endpoint
+STREAM_FLUSH_BYTES = int(os.getenv("STREAM_FLUSH_BYTES", "512"))  # 0 = one HTTP chunk per token
+STREAM_FLUSH_INTERVAL_MS = float(os.getenv("STREAM_FLUSH_INTERVAL_MS", "50"))
+
+# ----- Prometheus Metrics -----
+STREAM_TTFT = Histogram(
+    'chat_stream_time_to_first_token_seconds', 'Request start to first generated token', ['backend'],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+)
+STREAM_INTER_TOKEN = Histogram(
+    'chat_stream_inter_token_seconds', 'Gap between consecutive generated tokens', ['backend'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+STREAM_TOKENS_PER_SECOND = Histogram(
+    'chat_stream_tokens_per_second', 'Decode rate from first to last token', ['backend'],
+    buckets=(1, 2, 5, 10, 20, 30, 50, 75, 100, 200)
+)
+STREAM_COUNT = Counter('chat_streams_total', 'Token streams by outcome', ['backend', 'outcome'])
+STREAM_FLUSHES = Counter('chat_stream_flushes_total', 'HTTP chunks written by reason', ['endpoint', 'reason'])
+STREAM_FLUSH_SIZE = Histogram(
+    'chat_stream_flush_bytes', 'Size of each coalesced HTTP chunk', ['endpoint'],
+    buckets=(8, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def timed_stream(tokens: AsyncIterator[str], backend: str,
+                       started: Optional[float] = None) -> AsyncGenerator[str, None]:
+    """Pass `tokens` through, recording latency metrics. `started` is a perf_counter() value."""
+    start = started if started is not None else time.perf_counter()
+    first = last = None
+    count = 0
+    outcome = "error"
+    try:
+        async for token in tokens:
+            now = time.perf_counter()
+            if first is None:
+                first = now
+                STREAM_TTFT.labels(backend=backend).observe(now - start)
+            else:
+                STREAM_INTER_TOKEN.labels(backend=backend).observe(now - last)
+            last = now
+            count += 1
+            yield token
+        outcome = "ok"
+    except (GeneratorExit, asyncio.CancelledError):
+        outcome = "cancelled"
+        raise
+    finally:
+        if count > 1 and last > first:
+            STREAM_TOKENS_PER_SECOND.labels(backend=backend).observe((count - 1) / (last - first))
+        STREAM_COUNT.labels(backend=backend, outcome=outcome).inc()
+
+
+@dataclass(frozen=True)
+class FlushPolicy:
+    """When coalesce_chunks() writes to the client: `max_bytes` buffered or `max_delay` seconds
+    after the oldest buffered token, whichever comes first"""
+    endpoint: str
+    max_bytes: int = STREAM_FLUSH_BYTES
+    max_delay: float = STREAM_FLUSH_INTERVAL_MS / 1000
+
+    @classmethod
+    def from_env(cls, endpoint: str) -> "FlushPolicy":
+        suffix = endpoint.upper().replace("-", "_").replace("/", "_").strip("_")
+        return cls(
+            endpoint,
+            int(os.getenv(f"STREAM_FLUSH_BYTES_{suffix}", str(STREAM_FLUSH_BYTES))),
+            float(os.getenv(f"STREAM_FLUSH_INTERVAL_MS_{suffix}", str(STREAM_FLUSH_INTERVAL_MS))) / 1000,
+        )
+
+
+async def coalesce_chunks(chunks: AsyncIterator[str], policy: FlushPolicy,
+                          collect: Optional[List[str]] = None) -> AsyncGenerator[bytes, None]:
+    """Re-chunk a token stream into UTF-8 byte chunks per `policy`.
+
+    The first token goes out immediately so time-to-first-token is unchanged.
+    Every token is also appended to `collect`, for assembling the full text
+    with a single join instead of repeated concatenation.
+    """
+    loop = asyncio.get_running_loop()
+    buffer: List[bytes] = []
+    wake = asyncio.Event()
+    # Shared between the reader task and the writer loop below (same thread, no locking)
+    state = {"size": 0, "window": False, "expired": False, "finished": False, "error": None}
+
+    async def read():
+        # The writer is only woken to open a window, on the byte threshold or at the
+        # end, so a flush costs a couple of wake-ups however many tokens it carries
+        source = chunks.__aiter__()
+        try:
+            async for chunk in source:
+                if collect is not None:
+                    collect.append(chunk)
+                data = chunk.encode("utf-8")
+                if not data:
+                    continue
+                buffer.append(data)
+                state["size"] += len(data)
+                if not state["window"] or state["size"] >= policy.max_bytes:
+                    wake.set()
+        except Exception as e:
+            state["error"] = e
+        finally:
+            state["finished"] = True
+            wake.set()
+            if hasattr(source, "aclose"):
+                await source.aclose()
+
+    def expire():
+        state["expired"] = True
+        wake.set()
+
+    timer: Optional[asyncio.TimerHandle] = None
+
+    def flush(reason: str) -> bytes:
+        nonlocal timer
+        if timer is not None:
+            timer.cancel()
+            timer = None
+        data = b"".join(buffer)
+        buffer.clear()
+        state.update(size=0, window=False, expired=False)
+        STREAM_FLUSHES.labels(endpoint=policy.endpoint, reason=reason).inc()
+        STREAM_FLUSH_SIZE.labels(endpoint=policy.endpoint).observe(len(data))
+        return data
+
+    first = True
+    reader = asyncio.create_task(read())
+    try:
+        while True:
+            await wake.wait()
+            wake.clear()
+            if state["finished"]:
+                break
+            if not buffer:
+                continue
+            if first:
+                first = False
+                yield flush("first")
+            elif state["size"] >= policy.max_bytes:
+                yield flush("bytes")
+            elif state["expired"]:
+                yield flush("interval")
+            elif not state["window"]:
+                state["window"] = True
+                timer = loop.call_later(policy.max_delay, expire)
+
+        if buffer:
+            yield flush("end")
+        if state["error"] is not None:
+            raise state["error"]
+    finally:
+        if timer is not None:
+            timer.cancel()
+        if not reader.done():
+            reader.cancel()
+            await asyncio.wait((reader,))
+
+
+def sse_event(data: Dict, event: Optional[str] = None) -> str:
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return (f"event: {event}\n" if event else "") + f"data: {payload}\n\n"
+
+
+def stream_response(tokens: AsyncIterator[str], fmt: str, meta: Dict,
+                    on_complete: Callable[[str], Awaitable],
+                    finish: Optional[Callable[[], Awaitable[Dict]]] = None,
+                    headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    """Stream `tokens` to the client and call `on_complete(full_text)` once it has closed.
+
+    SSE clients get a `meta` event, one `data: {"token": ...}` event per token and
+    a final `done` event (merged with `finish()`), or an `error` event. Plain text
+    clients get the raw tokens. Interrupted or failed streams are not persisted.
+    """
+    parts: List[str] = []
+    completed = False
+
+    async def body():
+        nonlocal completed
+        sse = fmt == "sse"
+        if sse:
+            yield sse_event(meta, "meta")
+        try:
+            async for token in tokens:
+                parts.append(token)
+                yield sse_event({"token": token}) if sse else token
+        except Exception as e:
+            logger.error(f"Token stream failed: {e}")
+            if sse:
+                yield sse_event({"detail": "generation failed"}, "error")
+            return
+        completed = True
+        if sse:
+            done = dict(meta)
+            if finish is not None:
+                done.update(await finish())
+            yield sse_event(done, "done")
+
+    async def after_close():
+        if completed:
+            await on_complete("".join(parts))
+
+    return StreamingResponse(
+        body(),
+        media_type=STREAM_FORMATS[fmt],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **(headers or {})},
+        background=BackgroundTask(after_close),
+    )
+
+
+class StreamingGZipMiddleware(GZipMiddleware):
+    """GZip for every route except token streams, which must reach the client chunk by chunk"""
+
+    def __init__(self, app, minimum_size: int = 500, compresslevel: int = 9,
+                 skip_paths=("/chat/stream",)):
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.skip_paths = frozenset(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
@@ -0,0 +1,194 @@
+"""
+Per-user in-memory vector index over the Redis conversation history
+Contiguous float32 matrix of unit vectors, synced incrementally via a per-user version counter
+"""
+
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from prometheus_client import Counter, Gauge
+
+from embedding_storage import decode_history, encode_history_entry, history_vectors_key
+
+# ----- Config -----
+HISTORY_MAX_ITEMS = int(os.getenv("HISTORY_MAX_ITEMS", "100"))
+HISTORY_TTL = int(os.getenv("HISTORY_TTL_SECONDS", "86400"))  # 24 hours
+VECTOR_INDEX_MAX_USERS = int(os.getenv("VECTOR_INDEX_MAX_USERS", "10000"))
+
+# ----- Prometheus Metrics -----
+VECTOR_INDEX_LOADS = Counter('vector_index_loads_total', 'Index loads from Redis history', ['kind'])
+VECTOR_INDEX_USERS = Gauge('vector_index_users', 'Per-user indexes held in memory')
+
+logger = logging.getLogger(__name__)
+
+
+def history_key(user_id: str) -> str:
+    return f"user_history:{user_id}"
+
+
+def history_version_key(user_id: str) -> str:
+    return f"user_history_version:{user_id}"
+
+
+class UserVectorIndex:
+    """Ring buffer of pre-normalised vectors plus their metadata"""
+
+    def __init__(self, dim: int, capacity: int = HISTORY_MAX_ITEMS):
+        self.dim = dim
+        self.capacity = capacity
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.metadata: List[Optional[Dict]] = [None] * capacity
+        self.size = 0
+        self.version = 0
+        self._next = 0
+
+    def add(self, vector: Sequence[float], metadata: Dict) -> bool:
+        vector = np.asarray(vector, dtype=np.float32)
+        if vector.shape != (self.dim,):
+            return False
+        norm = float(np.linalg.norm(vector))
+        if norm == 0.0:
+            return False
+        self.vectors[self._next] = vector / norm
+        self.metadata[self._next] = metadata
+        self._next = (self._next + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return True
+
+    def search(self, query: np.ndarray, limit: int) -> List[Dict]:
+        """Top-k by cosine similarity; `query` must already be unit length"""
+        if self.size == 0 or limit <= 0:
+            return []
+        scores = self.vectors[:self.size] @ query
+        k = min(limit, self.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [dict(self.metadata[i], similarity=float(scores[i])) for i in top]
+
+
+class VectorIndexRegistry:
+    """Owns the `user_history:{user_id}` lists and an index per active user.
+
+    Every append bumps `user_history_version:{user_id}` in the same MULTI as
+    the LPUSH, so any worker can tell how many entries it is missing and
+    fetch only those instead of re-reading the whole list.
+    """
+
+    def __init__(self, redis_client=None, max_items: int = HISTORY_MAX_ITEMS,
+                 ttl: int = HISTORY_TTL, max_users: int = VECTOR_INDEX_MAX_USERS):
+        self.redis_client = redis_client
+        self.max_items = max_items
+        self.ttl = ttl
+        self.max_users = max_users
+        self._indexes: "OrderedDict[str, UserVectorIndex]" = OrderedDict()
+        self._lock = asyncio.Lock()
+
+    def _fill(self, index: Optional[UserVectorIndex], raws: List,
+              vector_raws: List) -> Optional[UserVectorIndex]:
+        # LPUSH keeps the newest entry first; add oldest first so the ring evicts correctly
+        for vector, metadata in reversed(decode_history(raws, vector_raws)):
+            if vector is None or len(vector) == 0:
+                continue
+            if index is None:
+                index = UserVectorIndex(len(vector), self.max_items)
+            index.add(vector, metadata)
+        return index
+
+    def _store(self, user_id: str, index: UserVectorIndex):
+        self._indexes[user_id] = index
+        self._indexes.move_to_end(user_id)
+        while len(self._indexes) > self.max_users:
+            self._indexes.popitem(last=False)
+        VECTOR_INDEX_USERS.set(len(self._indexes))
+
+    async def _read(self, user_id: str, count: int):
+        """Version and newest `count` entries in one MULTI so they always agree"""
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.get(history_version_key(user_id))
+            pipe.lrange(history_key(user_id), 0, count - 1)
+            pipe.lrange(history_vectors_key(user_id), 0, count - 1)
+            raw_version, raws, vector_raws = await pipe.execute()
+        return int(raw_version or 0), raws, vector_raws
+
+    async def _sync(self, user_id: str) -> Optional[UserVectorIndex]:
+        version = int(await self.redis_client.get(history_version_key(user_id)) or 0)
+        index = self._indexes.get(user_id)
+        if index is not None and index.version == version:
+            self._indexes.move_to_end(user_id)
+            return index
+
+        async with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None and index.version == version:
+                return index
+
+            missing = version - index.version if index is not None else 0
+            if index is not None and 0 < missing < self.max_items:
+                read_version, raws, vector_raws = await self._read(user_id, missing)
+                if read_version == version:
+                    self._fill(index, raws, vector_raws)
+                    index.version = version
+                    self._store(user_id, index)
+                    VECTOR_INDEX_LOADS.labels(kind="delta").inc()
+                    return index
+
+            read_version, raws, vector_raws = await self._read(user_id, self.max_items)
+            index = self._fill(None, raws, vector_raws)
+            VECTOR_INDEX_LOADS.labels(kind="full").inc()
+            if index is None:
+                self._indexes.pop(user_id, None)
+                return None
+            index.version = read_version
+            self._store(user_id, index)
+            return index
+
+    async def search(self, user_id: str, query_embedding: Sequence[float], limit: int = 5) -> List[Dict]:
+        if self.redis_client is None or not len(query_embedding):
+            return []
+        index = await self._sync(user_id)
+        if index is None:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if query.shape != (index.dim,) or norm == 0.0:
+            return []
+        return index.search(query / norm, limit)
+
+    async def append(self, user_id: str, entry: Dict):
+        """LPUSH one history entry and update the local index without re-reading Redis"""
+        await self.append_many([(user_id, entry)])
+
+    async def append_many(self, entries: List[Tuple[str, Dict]]):
+        """append() for several (user_id, entry) pairs in one MULTI: all are written or none"""
+        if self.redis_client is None or not entries:
+            return
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            for user_id, entry in entries:
+                key = history_key(user_id)
+                vec_key = history_vectors_key(user_id)
+                version_key = history_version_key(user_id)
+                payload, packed = encode_history_entry(entry)
+                pipe.lpush(key, payload)
+                pipe.lpush(vec_key, packed)
+                pipe.ltrim(key, 0, self.max_items - 1)
+                pipe.ltrim(vec_key, 0, self.max_items - 1)
+                pipe.expire(key, self.ttl)
+                pipe.expire(vec_key, self.ttl)
+                pipe.incr(version_key)
+                pipe.expire(version_key, self.ttl)
+            results = await pipe.execute()
+
+        for i, (user_id, entry) in enumerate(entries):
+            version = int(results[i * 8 + 6])
+            index = self._indexes.get(user_id)
+            if index is None or index.version != version - 1:
+                # Another worker wrote in between; the next search fetches the delta
+                continue
+            vector = entry.get("embedding")
+            metadata = {k: v for k, v in entry.items() if k != "embedding"}
+            if vector is not None and len(vector) and index.add(vector, metadata):
+                index.version = version